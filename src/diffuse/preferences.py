@@ -19,7 +19,9 @@
 
 import codecs
 import encodings
+import functools
 import os
+import re
 import shlex
 import sys
 
@@ -34,210 +36,268 @@ gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk  # type: ignore # noqa: E402
 
 
+# names of the available encodings
+_ENCODINGS: Final[Tuple[str, ...]] = tuple(sorted(set(encodings.aliases.aliases.values())))
+
+# default values of the preferences that do not depend upon the platform
+_BOOL_DEFAULTS: Final[Tuple[Tuple[str, bool], ...]] = (
+    ('display_show_right_margin', True),
+    ('display_show_line_numbers', True),
+    ('display_show_whitespace', False),
+    ('display_ignore_case', False),
+    ('display_ignore_whitespace', False),
+    ('display_ignore_whitespace_changes', False),
+    ('display_ignore_blanklines', False),
+    ('display_ignore_endofline', False),
+    ('align_ignore_case', False),
+    ('align_ignore_whitespace', True),
+    ('align_ignore_whitespace_changes', False),
+    ('align_ignore_blanklines', False),
+    ('align_ignore_endofline', True),
+    ('editor_auto_indent', True),
+    ('editor_expand_tabs', False),
+    ('tabs_always_show', False),
+    ('tabs_warn_before_quit', True)
+)
+
+# ( name, default, minimum, maximum )
+_INT_DEFAULTS: Final[Tuple[Tuple[str, int, int, int], ...]] = (
+    ('display_tab_width', 8, 1, 1024),
+    ('display_right_margin', 80, 1, 8192),
+    ('editor_soft_tab_width', 8, 1, 1024),
+    ('tabs_default_panes', 2, 2, 16)
+)
+
+_STRING_DEFAULTS: Final[Tuple[Tuple[str, str], ...]] = (
+    ('display_font', 'Monospace 10'),
+    ('vcs_search_order', 'bzr cvs darcs git hg mtn rcs svn')
+)
+
+# limits of the integer preferences
+_INT_PREFS_MIN: Final[Dict[str, int]] = {name: v for name, _d, v, _m in _INT_DEFAULTS}
+_INT_PREFS_MAX: Final[Dict[str, int]] = {name: v for name, _d, _m, v in _INT_DEFAULTS}
+
+# version control systems: ( key, name, command ), the command is None for
+# systems using multiple commands
+_VCS: Final[Tuple[Tuple[str, str, Optional[str]], ...]] = (
+    ('bzr', 'Bazaar', 'bzr'),
+    ('cvs', 'CVS', 'cvs'),
+    ('darcs', 'Darcs', 'darcs'),
+    ('git', 'Git', 'git'),
+    ('hg', 'Mercurial', 'hg'),
+    ('mtn', 'Monotone', 'mtn'),
+    ('rcs', 'RCS', None),
+    ('svn', 'Subversion', 'svn')
+)
+
+
 # class to store preferences and construct a dialogue for manipulating them
 class Preferences:
     def __init__(self, path: str) -> None:
         self.path = path
-        self.bool_prefs: Dict[str, bool] = {}
-        self.string_prefs: Dict[str, str] = {}
-        self.int_prefs: Dict[str, int] = {}
-        self.int_prefs_min: Dict[str, int] = {}
-        self.int_prefs_max: Dict[str, int] = {}
+        self.bool_prefs: Dict[str, bool] = dict(_BOOL_DEFAULTS)
+        self.string_prefs: Dict[str, str] = dict(_STRING_DEFAULTS)
+        self.int_prefs: Dict[str, int] = {name: v for name, v, _min, _max in _INT_DEFAULTS}
+        self.int_prefs_min: Final[Dict[str, int]] = _INT_PREFS_MIN
+        self.int_prefs_max: Final[Dict[str, int]] = _INT_PREFS_MAX
 
         # find available encodings
-        self.encodings: List[Optional[str]] = sorted(set(encodings.aliases.aliases.values()))
+        self.encodings: List[Optional[str]] = list(_ENCODINGS)
+
+        # the dialogue layout is only needed by runDialog()
+        self._template: Optional[List[Any]] = None
+
+        # non-empty components of path preferences, see _getPathParts()
+        self._path_parts: Dict[str, List[str]] = {}
+
+        # conditions used to determine if a preference should be greyed out
+        self.disable_when: Final[Dict[str, Tuple[str, bool]]] = {
+            'display_right_margin': ('display_show_right_margin', False),
+            'display_ignore_whitespace_changes': ('display_ignore_whitespace', True),
+            'display_ignore_blanklines': ('display_ignore_whitespace', True),
+            'display_ignore_endofline': ('display_ignore_whitespace', True),
+            'align_ignore_whitespace_changes': ('align_ignore_whitespace', True),
+            'align_ignore_blanklines': ('align_ignore_whitespace', True),
+            'align_ignore_endofline': ('align_ignore_whitespace', True)
+        }
 
+        self._initDefaults()
+        self.default_bool_prefs = self.bool_prefs.copy()
+        self.default_int_prefs = self.int_prefs.copy()
+        self.default_string_prefs = self.string_prefs.copy()
+
+        # load the user's preferences
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, 'r', buffering=65536, encoding='utf-8', errors='replace') as f:
+                    for j, s in enumerate(f):
+                        try:
+                            a = _split_pref_line(s.rstrip('\n'))
+                            if len(a) > 0:
+                                p = a[0]
+                                if len(a) == 2 and p in self.bool_prefs:
+                                    self.setBool(p, a[1] == 'True')
+                                elif len(a) == 2 and p in self.int_prefs:
+                                    self.setInt(p, max(
+                                        self.int_prefs_min[p],
+                                        min(int(a[1]), self.int_prefs_max[p])))
+                                elif len(a) == 2 and p in self.string_prefs:
+                                    self.setString(p, a[1])
+                                else:
+                                    raise ValueError()
+                        except ValueError:
+                            # this may happen if the prefs were written by a
+                            # different version -- don't bother the user
+                            utils.logDebug(f'Error processing line {j + 1} of {self.path}.')
+            except IOError:
+                # bad $HOME value? -- don't bother the user
+                utils.logDebug(f'Error reading {self.path}.')
+
+    # initialise the default values of the preferences that depend upon the
+    # platform
+    def _initDefaults(self) -> None:
         auto_detect_codecs = ['utf_8', 'utf_16', 'latin_1']
         e = utils.norm_encoding(sys.getfilesystemencoding())
         if e is not None and e not in auto_detect_codecs:
             # insert after UTF-8 as the default encoding may prevent UTF-8 from
             # being tried
             auto_detect_codecs.insert(2, e)
+        self.setString('encoding_default_codec', sys.getfilesystemencoding())
+        self.setString('encoding_auto_detect_codecs', ' '.join(auto_detect_codecs))
 
-        # self.template describes how preference dialogue layout
-        #
-        # this will be traversed later to build the preferences dialogue and
-        # discover which preferences exist
-        #
-        # folders are described using:
-        #    [ 'FolderSet', label1, template1, label2, template2, ... ]
-        # lists are described using:
-        #    [ 'List', template1, template2, template3, ... ]
-        # individual preferences are described using one of the following
-        # depending upon its type and the desired widget:
-        #    [ 'Boolean', name, default, label ]
-        #    [ 'Integer', name, default, label ]
-        #    [ 'String', name, default, label ]
-        #    [ 'File', name, default, label ]
-        #    [ 'Font', name, default, label ]
-        self.template = [
+        is_windows = utils.isWindows()
+        if is_windows:
+            root = os.environ.get('SYSTEMDRIVE', None)
+            if root is None:
+                root = 'C:\\'
+            elif not root.endswith('\\'):
+                root += '\\'
+            self.setString('cygwin_root', os.path.join(root, 'cygwin'))
+            self.setString('cygwin_cygdrive_prefix', '/cygdrive')
+
+        for key, _name, cmd in _VCS:
+            if cmd is None:
+                # RCS uses multiple commands
+                self.setString(key + '_bin_co', 'co')
+                self.setString(key + '_bin_rlog', 'rlog')
+            else:
+                self.setString(key + '_bin', cmd)
+            if is_windows:
+                self.setBool(key + '_bash', False)
+                if key != 'git':
+                    self.setBool(key + '_cygwin', False)
+
+    # returns the template describing the preferences dialogue, building it
+    # the first time it is needed
+    #
+    # folders are described using:
+    #    [ 'FolderSet', label1, template1, label2, template2, ... ]
+    # lists are described using:
+    #    [ 'List', template1, template2, template3, ... ]
+    # individual preferences are described using one of the following
+    # depending upon its type and the desired widget:
+    #    [ 'Boolean', name, label ]
+    #    [ 'Integer', name, label ]
+    #    [ 'String', name, label ]
+    #    [ 'File', name, label ]
+    #    [ 'Font', name, label ]
+    #    [ 'Encoding', name, label ]
+    # default values are registered separately by __init__()
+    def _getTemplate(self) -> List[Any]:
+        if self._template is not None:
+            return self._template
+
+        template: List[Any] = [
             'FolderSet',
             _('Display'),
             [
                 'List',
-                ['Font', 'display_font', 'Monospace 10', _('Font')],
-                ['Integer', 'display_tab_width', 8, _('Tab width'), 1, 1024],
-                ['Boolean', 'display_show_right_margin', True, _('Show right margin')],
-                ['Integer', 'display_right_margin', 80, _('Right margin'), 1, 8192],
-                ['Boolean', 'display_show_line_numbers', True, _('Show line numbers')],
-                ['Boolean', 'display_show_whitespace', False, _('Show white space characters')],
-                ['Boolean', 'display_ignore_case', False, _('Ignore case differences')],
-                ['Boolean', 'display_ignore_whitespace', False, _('Ignore white space differences')],  # noqa: E501
-                ['Boolean', 'display_ignore_whitespace_changes', False, _('Ignore changes to white space')],  # noqa: E501
-                ['Boolean', 'display_ignore_blanklines', False, _('Ignore blank line differences')],
-                ['Boolean', 'display_ignore_endofline', False, _('Ignore end of line differences')]
+                ['Font', 'display_font', _('Font')],
+                ['Integer', 'display_tab_width', _('Tab width')],
+                ['Boolean', 'display_show_right_margin', _('Show right margin')],
+                ['Integer', 'display_right_margin', _('Right margin')],
+                ['Boolean', 'display_show_line_numbers', _('Show line numbers')],
+                ['Boolean', 'display_show_whitespace', _('Show white space characters')],
+                ['Boolean', 'display_ignore_case', _('Ignore case differences')],
+                ['Boolean', 'display_ignore_whitespace', _('Ignore white space differences')],
+                ['Boolean', 'display_ignore_whitespace_changes', _('Ignore changes to white space')],  # noqa: E501
+                ['Boolean', 'display_ignore_blanklines', _('Ignore blank line differences')],
+                ['Boolean', 'display_ignore_endofline', _('Ignore end of line differences')]
             ],
             _('Alignment'),
             [
                 'List',
-                ['Boolean', 'align_ignore_case', False, _('Ignore case')],
-                ['Boolean', 'align_ignore_whitespace', True, _('Ignore white space')],
-                ['Boolean', 'align_ignore_whitespace_changes', False, _('Ignore changes to white space')],  # noqa: E501
-                ['Boolean', 'align_ignore_blanklines', False, _('Ignore blank lines')],
-                ['Boolean', 'align_ignore_endofline', True, _('Ignore end of line characters')]
+                ['Boolean', 'align_ignore_case', _('Ignore case')],
+                ['Boolean', 'align_ignore_whitespace', _('Ignore white space')],
+                ['Boolean', 'align_ignore_whitespace_changes', _('Ignore changes to white space')],
+                ['Boolean', 'align_ignore_blanklines', _('Ignore blank lines')],
+                ['Boolean', 'align_ignore_endofline', _('Ignore end of line characters')]
             ],
             _('Editor'),
             [
                 'List',
-                ['Boolean', 'editor_auto_indent', True, _('Auto indent')],
-                ['Boolean', 'editor_expand_tabs', False, _('Expand tabs to spaces')],
-                ['Integer', 'editor_soft_tab_width', 8, _('Soft tab width'), 1, 1024]
+                ['Boolean', 'editor_auto_indent', _('Auto indent')],
+                ['Boolean', 'editor_expand_tabs', _('Expand tabs to spaces')],
+                ['Integer', 'editor_soft_tab_width', _('Soft tab width')]
             ],
             _('Tabs'),
             [
                 'List',
-                ['Integer', 'tabs_default_panes', 2, _('Default panes'), 2, 16],
-                ['Boolean', 'tabs_always_show', False, _('Always show the tab bar')],
-                ['Boolean', 'tabs_warn_before_quit', True, _('Warn me when closing a tab will quit %s') % constants.APP_NAME]  # noqa: E501
+                ['Integer', 'tabs_default_panes', _('Default panes')],
+                ['Boolean', 'tabs_always_show', _('Always show the tab bar')],
+                ['Boolean', 'tabs_warn_before_quit', _('Warn me when closing a tab will quit %s') % constants.APP_NAME]  # noqa: E501
             ],
             _('Regional Settings'),
             [
                 'List',
-                ['Encoding', 'encoding_default_codec', sys.getfilesystemencoding(), _('Default codec')],  # noqa: E501
-                ['String', 'encoding_auto_detect_codecs', ' '.join(auto_detect_codecs), _('Order of codecs used to identify encoding')]  # noqa: E501
+                ['Encoding', 'encoding_default_codec', _('Default codec')],
+                ['String', 'encoding_auto_detect_codecs', _('Order of codecs used to identify encoding')]  # noqa: E501
             ],
         ]
 
-        # conditions used to determine if a preference should be greyed out
-        self.disable_when: Final[Dict[str, Tuple[str, bool]]] = {
-            'display_right_margin': ('display_show_right_margin', False),
-            'display_ignore_whitespace_changes': ('display_ignore_whitespace', True),
-            'display_ignore_blanklines': ('display_ignore_whitespace', True),
-            'display_ignore_endofline': ('display_ignore_whitespace', True),
-            'align_ignore_whitespace_changes': ('align_ignore_whitespace', True),
-            'align_ignore_blanklines': ('align_ignore_whitespace', True),
-            'align_ignore_endofline': ('align_ignore_whitespace', True)
-        }
         if utils.isWindows():
-            root = os.environ.get('SYSTEMDRIVE', None)
-            if root is None:
-                root = 'C:\\'
-            elif not root.endswith('\\'):
-                root += '\\'
-            self.template.extend([
+            template.extend([
                     _('Cygwin'),
                     ['List',
-                        ['File', 'cygwin_root', os.path.join(root, 'cygwin'), _('Root directory')],
-                        ['String', 'cygwin_cygdrive_prefix', '/cygdrive', _('Cygdrive prefix')]]
+                        ['File', 'cygwin_root', _('Root directory')],
+                        ['String', 'cygwin_cygdrive_prefix', _('Cygdrive prefix')]]
                 ])
 
         # create template for Version Control options
-        vcs = [('bzr', 'Bazaar', 'bzr'),
-               ('cvs', 'CVS', 'cvs'),
-               ('darcs', 'Darcs', 'darcs'),
-               ('git', 'Git', 'git'),
-               ('hg', 'Mercurial', 'hg'),
-               ('mtn', 'Monotone', 'mtn'),
-               ('rcs', 'RCS', None),
-               ('svn', 'Subversion', 'svn')]
-
         vcs_template = [
             'List', [
                 'String',
                 'vcs_search_order',
-                'bzr cvs darcs git hg mtn rcs svn',
                 _('Version control system search order')
             ]
         ]
         vcs_folders_template: List[Any] = ['FolderSet']
-        for key, name, cmd in vcs:
+        for key, name, cmd in _VCS:
             temp: List[Any] = ['List']
-            if key == 'rcs':
+            if cmd is None:
                 # RCS uses multiple commands
-                temp.extend([['File', key + '_bin_co', 'co', _('"co" command')],
-                             ['File', key + '_bin_rlog', 'rlog', _('"rlog" command')]])
+                temp.extend([['File', key + '_bin_co', _('"co" command')],
+                             ['File', key + '_bin_rlog', _('"rlog" command')]])
             else:
-                temp.extend([['File', key + '_bin', cmd, _('Command')]])
+                temp.extend([['File', key + '_bin', _('Command')]])
             if utils.isWindows():
                 temp.append([
                     'Boolean',
                     key + '_bash',
-                    False,
                     _('Launch from a Bash login shell')
                 ])
                 if key != 'git':
                     temp.append([
                         'Boolean',
                         key + '_cygwin',
-                        False,
                         _('Update paths for Cygwin')
                     ])
             vcs_folders_template.extend([name, temp])
         vcs_template.append(vcs_folders_template)
 
-        self.template.extend([_('Version Control'), vcs_template])
-        self._initFromTemplate(self.template)
-        self.default_bool_prefs = self.bool_prefs.copy()
-        self.default_int_prefs = self.int_prefs.copy()
-        self.default_string_prefs = self.string_prefs.copy()
-
-        # load the user's preferences
-        if os.path.isfile(self.path):
-            try:
-                with open(self.path, 'r', encoding='utf-8') as f:
-                    ss = utils.readconfiglines(f)
-                for j, s in enumerate(ss):
-                    try:
-                        a = shlex.split(s, True)
-                        if len(a) > 0:
-                            p = a[0]
-                            if len(a) == 2 and p in self.bool_prefs:
-                                self.setBool(p, a[1] == 'True')
-                            elif len(a) == 2 and p in self.int_prefs:
-                                self.setInt(p, max(
-                                    self.int_prefs_min[p],
-                                    min(int(a[1]), self.int_prefs_max[p])))
-                            elif len(a) == 2 and p in self.string_prefs:
-                                self.setString(p, a[1])
-                            else:
-                                raise ValueError()
-                    except ValueError:
-                        # this may happen if the prefs were written by a
-                        # different version -- don't bother the user
-                        utils.logDebug(f'Error processing line {j + 1} of {self.path}.')
-            except IOError:
-                # bad $HOME value? -- don't bother the user
-                utils.logDebug(f'Error reading {self.path}.')
-
-    # recursively traverses 'template' to discover the preferences and
-    # initialise their default values in self.bool_prefs, self.int_prefs, and
-    # self.string_prefs
-    def _initFromTemplate(self, template):
-        if template[0] == 'FolderSet' or template[0] == 'List':
-            i = 1
-            while i < len(template):
-                if template[0] == 'FolderSet':
-                    i += 1
-                self._initFromTemplate(template[i])
-                i += 1
-        elif template[0] == 'Boolean':
-            self.setBool(template[1], template[2])
-        elif template[0] == 'Integer':
-            self.setInt(template[1], template[2])
-            self.int_prefs_min[template[1]] = template[4]
-            self.int_prefs_max[template[1]] = template[5]
-        elif template[0] in ['String', 'File', 'Font', 'Encoding']:
-            self.setString(template[1], template[2])
+        template.extend([_('Version Control'), vcs_template])
+        self._template = template
+        return template
 
     # callback used when a preference is toggled
     def _toggled_cb(self, widget, widgets, name):
@@ -255,7 +315,8 @@ class Preferences:
         dialog.add_button(_('_OK'), Gtk.ResponseType.OK)
 
         widgets: Dict[str, Gtk.Widget] = {}
-        w = self._buildPrefsDialog(parent, widgets, self.template)
+        values: List[Tuple[str, str, Gtk.Widget]] = []
+        w = self._buildPrefsDialog(parent, widgets, values, self._getTemplate())
         # disable any preferences than are not relevant
         for k, tuple_value in self.disable_when.items():
             p, t = tuple_value
@@ -266,13 +327,15 @@ class Preferences:
 
         accept = (dialog.run() == Gtk.ResponseType.OK)
         if accept:
-            for k in self.bool_prefs:
-                self.setBool(k, widgets[k].get_active())
-            for k in self.int_prefs:
-                self.setInt(k, widgets[k].get_value_as_int())
-            for k in self.string_prefs:
-                text = self._getWidgetText(widgets[k])
-                self.setString(k, utils.null_to_empty(text))
+            for tpl_section, k, widget in values:
+                if tpl_section == 'Boolean':
+                    self.setBool(k, widget.get_active())
+                elif tpl_section == 'Integer':
+                    self.setInt(k, widget.get_value_as_int())
+                elif tpl_section == 'Font':
+                    self.setString(k, utils.null_to_empty(widget.get_font()))
+                else:
+                    self.setString(k, utils.null_to_empty(widget.get_text()))
             try:
                 ss = []
                 for k, bool_value in self.bool_prefs.items():
@@ -283,13 +346,12 @@ class Preferences:
                         ss.append(f'{k} {int_value}\n')
                 for k, str_value in self.string_prefs.items():
                     if str_value != self.default_string_prefs[k]:
-                        v_escaped = str_value.replace('\\', '\\\\').replace('"', '\\"')
+                        v_escaped = str_value.translate(_PREF_ESCAPE_TABLE)
                         ss.append(f'{k} "{v_escaped}"\n')
                 ss.sort()
+                ss.insert(0, f'# This prefs file was generated by {constants.APP_NAME} {constants.VERSION}.\n\n')  # noqa: E501
                 with open(self.path, 'w', encoding='utf-8') as f:
-                    f.write(f'# This prefs file was generated by {constants.APP_NAME} {constants.VERSION}.\n\n')  # noqa: E501
-                    for s in ss:
-                        f.write(s)
+                    f.write(''.join(ss))
             except IOError:
                 utils.logErrorAndDialog(_('Error writing %s.') % (self.path, ), parent)
         dialog.destroy()
@@ -297,18 +359,16 @@ class Preferences:
 
     # recursively traverses 'template' to build the preferences dialogue
     # and the individual preference widgets into 'widgets' so their value
-    # can be easily queried by the caller
-    def _buildPrefsDialog(self, parent, widgets, template):
+    # can be easily queried by the caller, 'values' receives the type, name,
+    # and widget of each preference in the order they were added
+    def _buildPrefsDialog(self, parent, widgets, values, template):
         tpl_section = template[0]
         if tpl_section == 'FolderSet':
             notebook = Gtk.Notebook()
             notebook.set_border_width(10)
-            i = 1
-            while i < len(template):
-                label = Gtk.Label(label=template[i])
-                i += 1
-                w = self._buildPrefsDialog(parent, widgets, template[i])
-                i += 1
+            for label_text, tpl in zip(template[1::2], template[2::2]):
+                label = Gtk.Label(label=label_text)
+                w = self._buildPrefsDialog(parent, widgets, values, tpl)
                 notebook.append_page(w, label)
                 w.show()
                 label.show()
@@ -319,23 +379,24 @@ class Preferences:
         for i, tpl in enumerate(template[1:]):
             tpl_section = tpl[0]
             if tpl_section == 'FolderSet':
-                w = self._buildPrefsDialog(parent, widgets, tpl)
+                w = self._buildPrefsDialog(parent, widgets, values, tpl)
                 table.attach(w, 0, i, 2, 1)
                 w.show()
             elif tpl_section == 'Boolean':
-                button = Gtk.CheckButton.new_with_mnemonic(tpl[3])
+                button = Gtk.CheckButton.new_with_mnemonic(tpl[2])
                 button.set_active(self.getBool(tpl[1]))
                 widgets[tpl[1]] = button
+                values.append((tpl_section, tpl[1], button))
                 table.attach(button, 1, i, 1, 1)
                 button.connect('toggled', self._toggled_cb, widgets, tpl[1])
                 button.show()
             else:
-                label = Gtk.Label(label=tpl[3] + ': ')
+                label = Gtk.Label(label=tpl[2] + ': ')
                 label.set_xalign(1.0)
                 label.set_yalign(0.5)
                 table.attach(label, 0, i, 1, 1)
                 label.show()
-                if tpl_section in ['Font', 'Integer']:
+                if tpl_section in ('Font', 'Integer'):
                     entry = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
                     if tpl_section == 'Font':
                         button = Gtk.FontButton()
@@ -343,8 +404,8 @@ class Preferences:
                     else:
                         adj = Gtk.Adjustment(
                             value=self.getInt(tpl[1]),
-                            lower=tpl[4],
-                            upper=tpl[5],
+                            lower=self.int_prefs_min[tpl[1]],
+                            upper=self.int_prefs_max[tpl[1]],
                             step_increment=1,
                             page_increment=0,
                             page_size=0)
@@ -353,37 +414,25 @@ class Preferences:
                             climb_rate=1.0,
                             digits=0)
                     widgets[tpl[1]] = button
+                    values.append((tpl_section, tpl[1], button))
                     entry.pack_start(button, False, False, 0)
                     button.show()
                 else:
                     if tpl_section == 'Encoding':
                         entry = utils.EncodingMenu(self)
-                        entry.set_text(tpl[3])
+                        entry.set_text(tpl[2])
                     elif tpl_section == 'File':
-                        entry = _FileEntry(parent, tpl[3])
+                        entry = _FileEntry(parent, tpl[2])
                     else:
                         entry = Gtk.Entry()
                     widgets[tpl[1]] = entry
+                    values.append((tpl_section, tpl[1], entry))
                     entry.set_text(self.getString(tpl[1]))
                 table.attach(entry, 1, i, 1, 1)
                 entry.show()
-            table.show()
+        table.show()
         return table
 
-    def _getWidgetText(self, widget):
-        text = ""
-        if (
-            isinstance(widget, Gtk.Entry) or
-            isinstance(widget, utils.EncodingMenu) or
-            isinstance(widget, _FileEntry)
-        ):
-            text = widget.get_text()
-        elif isinstance(widget, Gtk.FontButton):
-            text = widget.get_font()
-        else:
-            raise TypeError(f"Don't know how to get text from type: {type(widget)}")
-        return text
-
     # get/set methods to manipulate the preference values
     def getBool(self, name: str) -> bool:
         return self.bool_prefs[name]
@@ -402,33 +451,32 @@ class Preferences:
 
     def setString(self, name: str, value: str) -> None:
         self.string_prefs[name] = value
+        self._path_parts.pop(name, None)
+
+    # returns the non-empty components of a path preference, the result is
+    # cached until the preference changes and must not be modified
+    def _getPathParts(self, name: str, sep: str) -> List[str]:
+        parts = self._path_parts.get(name)
+        if parts is None:
+            parts = list(filter(None, self.getString(name).split(sep)))
+            self._path_parts[name] = parts
+        return parts
 
     def getEncodings(self) -> List[Optional[str]]:
         return self.encodings
 
-    def _getDefaultEncodings(self) -> List[str]:
-        return self.getString('encoding_auto_detect_codecs').split()
-
     def getDefaultEncoding(self) -> str:
         return self.getString('encoding_default_codec')
 
     # attempt to convert a string to unicode from an unknown encoding
     def convertToUnicode(self, s):
-        # a BOM is required for autodetecting UTF16 and UTF32
-        magic = {'utf16': [codecs.BOM_UTF16_BE, codecs.BOM_UTF16_LE],
-                 'utf32': [codecs.BOM_UTF32_BE, codecs.BOM_UTF32_LE]}
-        for encoding in self._getDefaultEncodings():
+        for encoding, boms in _get_detection_order(self.getString('encoding_auto_detect_codecs')):
             try:
-                encoding = encoding.lower().replace('-', '').replace('_', '')
-                for m in magic.get(encoding, [b'']):
-                    if s.startswith(m):
-                        break
-                else:
-                    continue
-                return str(s, encoding=encoding), encoding
+                if boms is None or s.startswith(boms):
+                    return str(s, encoding=encoding), encoding
             except (UnicodeDecodeError, LookupError):
                 pass
-        return ''.join([chr(ord(c)) for c in s]), None
+        return s.decode('latin_1'), None
 
     # cygwin and native applications can be used on windows, use this method
     # to convert a path to the usual form expected on sys.platform
@@ -441,14 +489,14 @@ class Preferences:
             if s.startswith('//'):
                 p[:0] = ['', '']
             elif s.startswith('/'):
-                pr = [a for a in self.getString('cygwin_cygdrive_prefix').split('/') if a != '']
+                pr = self._getPathParts('cygwin_cygdrive_prefix', '/')
                 n = len(pr)
                 if len(p) > n and len(p[n]) == 1 and p[:n] == pr:
                     # path starts with cygdrive prefix
                     p[:n + 1] = [p[n] + ':']
                 else:
                     # full path
-                    p[:0] = [a for a in self.getString('cygwin_root').split(os.sep) if a != '']
+                    p[:0] = self._getPathParts('cygwin_root', os.sep)
             # add trailing slash
             if p[-1] != '' and s.endswith('/'):
                 p.append('')
@@ -456,6 +504,54 @@ class Preferences:
         return s
 
 
+# a BOM is required for autodetecting UTF16 and UTF32
+_BOMS: Final[Dict[str, Tuple[bytes, ...]]] = {
+    'utf16': (codecs.BOM_UTF16_BE, codecs.BOM_UTF16_LE),
+    'utf32': (codecs.BOM_UTF32_BE, codecs.BOM_UTF32_LE)
+}
+
+
+# returns the normalised names of the codecs to try when identifying an
+# encoding and the BOMs required by each, if any
+@functools.lru_cache(maxsize=8)
+def _get_detection_order(names: str) -> Tuple[Tuple[str, Optional[Tuple[bytes, ...]]], ...]:
+    result = []
+    for encoding in names.split():
+        encoding = encoding.lower().replace('-', '').replace('_', '')
+        result.append((encoding, _BOMS.get(encoding)))
+    return tuple(result)
+
+
+# matches the 'key value' and 'key "value"' lines written by runDialog(),
+# comments, and blank lines
+_PREF_LINE_PATTERN: Final = re.compile(
+    r'[ \t\r\n]*(?:'
+    r'''([^ \t\r\n"'\\#]+)(?: ([^ \t\r\n"'\\#]+)| "((?:[^"\\]|\\[\s\S])*)")?'''
+    r'[ \t\r\n]*|#.*)')
+_PREF_ESCAPE_PATTERN: Final = re.compile(r'\\([\\"])')
+
+# escapes back slashes and double quotes when writing a quoted value
+_PREF_ESCAPE_TABLE: Final = str.maketrans({'\\': '\\\\', '"': '\\"'})
+
+
+# splits a line of the preferences file in the same way as shlex.split(s, True)
+# directly handling the lines written by runDialog() and leaving anything else
+# to shlex
+def _split_pref_line(s: str) -> List[str]:
+    m = _PREF_LINE_PATTERN.fullmatch(s)
+    if m is None:
+        return shlex.split(s, True)
+    key, value, quoted = m.groups()
+    if key is None:
+        return []
+    if value is not None:
+        return [key, value]
+    if quoted is not None:
+        # undo the escaping of '\\' and '"', other back slashes are literal
+        return [key, _PREF_ESCAPE_PATTERN.sub(r'\1', quoted)]
+    return [key]
+
+
 # text entry widget with a button to help pick file names
 class _FileEntry(Gtk.Box):
     def __init__(self, parent: Gtk.Widget, title: str) -> None:
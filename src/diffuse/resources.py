@@ -31,7 +31,7 @@ import re
 import shlex
 
 from gettext import gettext as _
-from typing import Dict, Final, List, Optional, Pattern, Set, Tuple
+from typing import Dict, Final, List, Optional, Pattern, Sequence, Set, Tuple
 
 from diffuse import utils
 
@@ -43,163 +43,16 @@ from gi.repository import Gdk  # type: ignore # noqa: E402
 class Resources:
     def __init__(self):
         # default keybindings
-        defaultModKey = 'Cmd+' if platform.system() == 'Darwin' else 'Ctrl+'
-        self.keybindings = {}
+        self.keybindings: Dict[Tuple[str, str], Set[Tuple[str, Tuple[int, int]]]] = {}
         self.keybindings_lookup = {}
-        self.setKeyBinding('menu', 'open-file', defaultModKey + 'o')
-        self.setKeyBinding('menu', 'open-file-in-new-tab', defaultModKey + 't')
-        self.setKeyBinding('menu', 'open-modified-files', 'Shift+Ctrl+O')
-        self.setKeyBinding('menu', 'open-commit', 'Shift+Ctrl+T')
-        self.setKeyBinding('menu', 'reload-file', 'Shift+Ctrl+R')
-        self.setKeyBinding('menu', 'save-file', defaultModKey + 's')
-        self.setKeyBinding('menu', 'save-file-as', defaultModKey + 'Shift+A')
-        self.setKeyBinding('menu', 'save-all', defaultModKey + 'Shift+S')
-        self.setKeyBinding('menu', 'new-2-way-file-merge', 'Ctrl+2')
-        self.setKeyBinding('menu', 'new-3-way-file-merge', 'Ctrl+3')
-        self.setKeyBinding('menu', 'new-n-way-file-merge', 'Ctrl+4')
-        self.setKeyBinding('menu', 'close-tab', defaultModKey + 'w')
-        self.setKeyBinding('menu', 'undo-close-tab', defaultModKey + 'Shift+W')
-        self.setKeyBinding('menu', 'quit', defaultModKey + 'q')
-        self.setKeyBinding('menu', 'undo', defaultModKey + 'z')
-        self.setKeyBinding('menu', 'redo', defaultModKey + 'Shift+Z')
-        self.setKeyBinding('menu', 'cut', defaultModKey + 'x')
-        self.setKeyBinding('menu', 'copy', defaultModKey + 'c')
-        self.setKeyBinding('menu', 'paste', defaultModKey + 'v')
-        self.setKeyBinding('menu', 'select-all', defaultModKey + 'a')
-        self.setKeyBinding('menu', 'clear-edits', defaultModKey + 'r')
-        self.setKeyBinding('menu', 'dismiss-all-edits', defaultModKey + 'd')
-        self.setKeyBinding('menu', 'find', defaultModKey + 'f')
-        self.setKeyBinding('menu', 'find-next', defaultModKey + 'g')
-        self.setKeyBinding('menu', 'find-previous', defaultModKey + 'Shift+G')
-        self.setKeyBinding('menu', 'go-to-line', defaultModKey + 'Shift+l')
-        self.setKeyBinding('menu', 'realign-all', defaultModKey + 'l')
-        self.setKeyBinding('menu', 'isolate', defaultModKey + 'i')
-        self.setKeyBinding('menu', 'first-difference', defaultModKey + 'Shift+Up')
-        self.setKeyBinding('menu', 'previous-difference', defaultModKey + 'Up')
-        self.setKeyBinding('menu', 'next-difference', defaultModKey + 'Down')
-        self.setKeyBinding('menu', 'last-difference', defaultModKey + 'Shift+Down')
-        self.setKeyBinding('menu', 'first-tab', 'Shift+Ctrl+Page_Up')
-        self.setKeyBinding('menu', 'previous-tab', 'Ctrl+Page_Up')
-        self.setKeyBinding('menu', 'next-tab', 'Ctrl+Page_Down')
-        self.setKeyBinding('menu', 'last-tab', 'Shift+Ctrl+Page_Down')
-        self.setKeyBinding('menu', 'shift-pane-right', 'Shift+Ctrl+parenright')
-        self.setKeyBinding('menu', 'shift-pane-left', 'Shift+Ctrl+parenleft')
-        self.setKeyBinding('menu', 'convert-to-upper-case', defaultModKey + 'u')
-        self.setKeyBinding('menu', 'convert-to-lower-case', defaultModKey + 'Shift+U')
-        self.setKeyBinding('menu', 'sort-lines-in-ascending-order', defaultModKey + 'y')
-        self.setKeyBinding('menu', 'sort-lines-in-descending-order', defaultModKey + 'Shift+Y')
-        self.setKeyBinding('menu', 'remove-trailing-white-space', defaultModKey + 'k')
-        self.setKeyBinding('menu', 'convert-tabs-to-spaces', defaultModKey + 'b')
-        self.setKeyBinding('menu', 'convert-leading-spaces-to-tabs', 'Shift+Ctrl+B')
-        self.setKeyBinding('menu', 'increase-indenting', defaultModKey + 'Shift+greater')
-        self.setKeyBinding('menu', 'decrease-indenting', defaultModKey + 'Shift+less')
-        self.setKeyBinding('menu', 'convert-to-dos', defaultModKey + 'Shift+E')
-        self.setKeyBinding('menu', 'convert-to-mac', defaultModKey + 'Shift+C')
-        self.setKeyBinding('menu', 'convert-to-unix', defaultModKey + 'e')
-        self.setKeyBinding('menu', 'copy-selection-right', defaultModKey + 'Shift+Right')
-        self.setKeyBinding('menu', 'copy-selection-left', defaultModKey + 'Shift+Left')
-        self.setKeyBinding('menu', 'copy-left-into-selection', defaultModKey + 'Right')
-        self.setKeyBinding('menu', 'copy-right-into-selection', defaultModKey + 'Left')
-        self.setKeyBinding('menu', 'merge-from-left-then-right', defaultModKey + 'm')
-        self.setKeyBinding('menu', 'merge-from-right-then-left', defaultModKey + 'Shift+M')
-        self.setKeyBinding('menu', 'help-contents', 'F1')
-        self.setKeyBinding('line_mode', 'enter-align-mode', 'space')
-        self.setKeyBinding('line_mode', 'enter-character-mode', 'Return')
-        self.setKeyBinding('line_mode', 'enter-character-mode', 'KP_Enter')
-        self.setKeyBinding('line_mode', 'first-line', 'Home')
-        self.setKeyBinding('line_mode', 'first-line', 'g')
-        self.setKeyBinding('line_mode', 'extend-first-line', 'Shift+Home')
-        self.setKeyBinding('line_mode', 'last-line', 'End')
-        self.setKeyBinding('line_mode', 'last-line', 'Shift+G')
-        self.setKeyBinding('line_mode', 'extend-last-line', 'Shift+End')
-        self.setKeyBinding('line_mode', 'up', 'Up')
-        self.setKeyBinding('line_mode', 'up', 'k')
-        self.setKeyBinding('line_mode', 'extend-up', 'Shift+Up')
-        self.setKeyBinding('line_mode', 'extend-up', 'Shift+K')
-        self.setKeyBinding('line_mode', 'down', 'Down')
-        self.setKeyBinding('line_mode', 'down', 'j')
-        self.setKeyBinding('line_mode', 'extend-down', 'Shift+Down')
-        self.setKeyBinding('line_mode', 'extend-down', 'Shift+J')
-        self.setKeyBinding('line_mode', 'left', 'Left')
-        self.setKeyBinding('line_mode', 'left', 'h')
-        self.setKeyBinding('line_mode', 'extend-left', 'Shift+Left')
-        self.setKeyBinding('line_mode', 'right', 'Right')
-        self.setKeyBinding('line_mode', 'right', 'l')
-        self.setKeyBinding('line_mode', 'extend-right', 'Shift+Right')
-        self.setKeyBinding('line_mode', 'page-up', 'Page_Up')
-        self.setKeyBinding('line_mode', 'page-up', defaultModKey + 'u')
-        self.setKeyBinding('line_mode', 'extend-page-up', 'Shift+Page_Up')
-        self.setKeyBinding('line_mode', 'extend-page-up', defaultModKey + 'Shift+U')
-        self.setKeyBinding('line_mode', 'page-down', 'Page_Down')
-        self.setKeyBinding('line_mode', 'page-down', defaultModKey + 'd')
-        self.setKeyBinding('line_mode', 'extend-page-down', 'Shift+Page_Down')
-        self.setKeyBinding('line_mode', 'extend-page-down', defaultModKey + 'Shift+D')
-        self.setKeyBinding('line_mode', 'delete-text', 'BackSpace')
-        self.setKeyBinding('line_mode', 'delete-text', 'Delete')
-        self.setKeyBinding('line_mode', 'delete-text', 'x')
-        self.setKeyBinding('line_mode', 'clear-edits', 'r')
-        self.setKeyBinding('line_mode', 'isolate', 'i')
-        self.setKeyBinding('line_mode', 'first-difference', 'Ctrl+Home')
-        self.setKeyBinding('line_mode', 'first-difference', 'Shift+P')
-        self.setKeyBinding('line_mode', 'previous-difference', 'p')
-        self.setKeyBinding('line_mode', 'next-difference', 'n')
-        self.setKeyBinding('line_mode', 'last-difference', 'Ctrl+End')
-        self.setKeyBinding('line_mode', 'last-difference', 'Shift+N')
-        # self.setKeyBinding('line_mode', 'copy-selection-right', 'Shift+L')
-        # self.setKeyBinding('line_mode', 'copy-selection-left', 'Shift+H')
-        self.setKeyBinding('line_mode', 'copy-left-into-selection', 'Shift+L')
-        self.setKeyBinding('line_mode', 'copy-right-into-selection', 'Shift+H')
-        self.setKeyBinding('line_mode', 'merge-from-left-then-right', 'm')
-        self.setKeyBinding('line_mode', 'merge-from-right-then-left', 'Shift+M')
-        self.setKeyBinding('align_mode', 'enter-line-mode', 'Escape')
-        self.setKeyBinding('align_mode', 'align', 'space')
-        self.setKeyBinding('align_mode', 'enter-character-mode', 'Return')
-        self.setKeyBinding('align_mode', 'enter-character-mode', 'KP_Enter')
-        self.setKeyBinding('align_mode', 'first-line', 'g')
-        self.setKeyBinding('align_mode', 'last-line', 'Shift+G')
-        self.setKeyBinding('align_mode', 'up', 'Up')
-        self.setKeyBinding('align_mode', 'up', 'k')
-        self.setKeyBinding('align_mode', 'down', 'Down')
-        self.setKeyBinding('align_mode', 'down', 'j')
-        self.setKeyBinding('align_mode', 'left', 'Left')
-        self.setKeyBinding('align_mode', 'left', 'h')
-        self.setKeyBinding('align_mode', 'right', 'Right')
-        self.setKeyBinding('align_mode', 'right', 'l')
-        self.setKeyBinding('align_mode', 'page-up', 'Page_Up')
-        self.setKeyBinding('align_mode', 'page-up', defaultModKey + 'u')
-        self.setKeyBinding('align_mode', 'page-down', 'Page_Down')
-        self.setKeyBinding('align_mode', 'page-down', defaultModKey + 'd')
-        self.setKeyBinding('character_mode', 'enter-line-mode', 'Escape')
+        for ctx, name, binding in _DEFAULT_KEY_BINDINGS:
+            self.setKeyBinding(ctx, name, binding)
 
         # default colours
-        self.colours: Dict[str, _Colour] = {
-            'alignment': _Colour(1.0, 1.0, 0.0),
-            'character_selection': _Colour(0.7, 0.7, 1.0),
-            'cursor': _Colour(0.0, 0.0, 0.0),
-            'difference_1': _Colour(1.0, 0.625, 0.625),
-            'difference_2': _Colour(0.85, 0.625, 0.775),
-            'difference_3': _Colour(0.85, 0.775, 0.625),
-            'hatch': _Colour(0.8, 0.8, 0.8),
-            'line_number': _Colour(0.0, 0.0, 0.0),
-            'line_number_background': _Colour(0.75, 0.75, 0.75),
-            'line_selection': _Colour(0.7, 0.7, 1.0),
-            'map_background': _Colour(0.6, 0.6, 0.6),
-            'margin': _Colour(0.8, 0.8, 0.8),
-            'edited': _Colour(0.5, 1.0, 0.5),
-            'preedit': _Colour(0.0, 0.0, 0.0),
-            'text': _Colour(0.0, 0.0, 0.0),
-            'text_background': _Colour(1.0, 1.0, 1.0)
-        }
+        self.colours: Dict[str, _Colour] = _DEFAULT_COLOURS.copy()
 
         # default floats
-        self.floats: Dict[str, float] = {
-            'alignment_opacity': 1.0,
-            'character_difference_opacity': 0.4,
-            'character_selection_opacity': 0.4,
-            'edited_opacity': 0.4,
-            'line_difference_opacity': 0.3,
-            'line_selection_opacity': 0.4
-        }
+        self.floats: Dict[str, float] = _DEFAULT_FLOATS.copy()
 
         # default options
         self.options: Dict[str, str] = {
@@ -229,21 +82,18 @@ class Resources:
         modifier_flags = Gdk.ModifierType(0)
         key = None
         for token in modifiers.split('+'):
-            if token == 'Shift':
-                modifier_flags |= Gdk.ModifierType.SHIFT_MASK
-            elif token == 'Ctrl':
-                modifier_flags |= Gdk.ModifierType.CONTROL_MASK
-            elif token == 'Cmd':
-                modifier_flags |= Gdk.ModifierType.META_MASK
-            elif token == 'Alt':
-                modifier_flags |= Gdk.ModifierType.MOD1_MASK
-            elif len(token) == 0 or token[0] == '_':
-                raise ValueError(_('The key binding "{key}" is invalid').format(key=modifiers))
-            else:
-                token = 'KEY_' + token
-                if not hasattr(Gdk, token):
+            flag = _MODIFIER_FLAGS.get(token)
+            if flag is not None:
+                modifier_flags |= flag
+                continue
+            key = _KEY_CACHE.get(token)
+            if key is None:
+                if len(token) == 0 or token[0] == '_':
+                    raise ValueError(_('The key binding "{key}" is invalid').format(key=modifiers))
+                key = getattr(Gdk, 'KEY_' + token, None)
+                if key is None:
                     raise ValueError(_('The key binding "{key}" is invalid').format(key=modifiers))
-                key = getattr(Gdk, token)
+                _KEY_CACHE[token] = key
         if key is None:
             raise ValueError(_('The key binding "{key}" is invalid').format(key=modifiers))
         key_tuple = (ctx, (key, modifier_flags))
@@ -253,27 +103,26 @@ class Resources:
             self._removeKeyBinding(key_tuple)
 
         # ensure we have a set to hold this action
-        if action_tuple not in self.keybindings:
-            self.keybindings[action_tuple] = {}
-        bindings = self.keybindings[action_tuple]
+        bindings = self.keybindings.get(action_tuple)
+        if bindings is None:
+            bindings = self.keybindings[action_tuple] = set()
 
         # menu items can only have one binding
         if ctx == 'menu':
-            for k in bindings.keys():
+            for k in tuple(bindings):
                 self._removeKeyBinding(k)
 
         # add the binding
-        bindings[key_tuple] = None
+        bindings.add(key_tuple)
         self.keybindings_lookup[key_tuple] = action_tuple
 
     def _removeKeyBinding(self, key_tuple):
-        action_tuple = self.keybindings_lookup[key_tuple]
-        del self.keybindings_lookup[key_tuple]
-        del self.keybindings[action_tuple][key_tuple]
+        action_tuple = self.keybindings_lookup.pop(key_tuple)
+        self.keybindings[action_tuple].discard(key_tuple)
 
     def getKeyBindings(self, ctx, name):
         try:
-            return [t for _, t in self.keybindings[(ctx, name)].keys()]
+            return [t for _, t in self.keybindings[(ctx, name)]]
         except KeyError:
             return []
 
@@ -358,158 +207,22 @@ class Resources:
             return
 
         self.resource_files.add(file_name)
-        with open(file_name, 'r', encoding='utf-8') as f:
+        # line endings are handled by readconfiglines()
+        with open(file_name, 'r', encoding='utf-8', newline='') as f:
             ss = utils.readconfiglines(f)
 
         # FIXME: improve validation
         for i, s in enumerate(ss):
-            args = shlex.split(s, True)
+            args = _splitArgs(s)
             if len(args) == 0:
                 continue
 
             try:
-                # eg. add Python syntax highlighting:
-                #    import /usr/share/diffuse/syntax/python.syntax
-                if args[0] == 'import':
-                    if len(args) != 2:
-                        raise SyntaxError(_('Imports must have one argument'))
-                    path = os.path.expanduser(args[1])
-                    # relative paths are relative to the parsed file
-                    path = os.path.join(utils.globEscape(os.path.dirname(file_name)), path)
-                    paths = glob.glob(path)
-                    if len(paths) == 0:
-                        paths = [path]
-                    for path in paths:
-                        # convert to absolute path so the location of
-                        # any processing errors are reported with
-                        # normalized file names
-                        self.parse(os.path.abspath(path))
-                # eg. make Ctrl+o trigger the open_file menu item
-                #    keybinding menu open_file Ctrl+o
-                elif args[0] == 'keybinding':
-                    if len(args) != 4:
-                        raise SyntaxError(_('Key bindings must have three arguments'))
-                    self.setKeyBinding(args[1], args[2], args[3])
-                # eg. set the regular background colour to white
-                #    colour text_background 1.0 1.0 1.0
-                elif args[0] in ['colour', 'color']:
-                    if len(args) != 5:
-                        raise SyntaxError(_('Colors must have four arguments'))
-                    self.colours[args[1]] = _Colour(float(args[2]), float(args[3]), float(args[4]))
-                # eg. set opacity of the line_selection colour
-                #    float line_selection_opacity 0.4
-                elif args[0] == 'float':
-                    if len(args) != 3:
-                        raise SyntaxError(_('Floats must have two arguments'))
-                    self.floats[args[1]] = float(args[2])
-                # eg. enable option log_print_output
-                #    option log_print_output true
-                elif args[0] == 'option':
-                    if len(args) != 3:
-                        raise SyntaxError(_('Options must have two arguments'))
-                    if args[1] not in self.options:
-                        raise SyntaxError(
-                            _('Option "{option}" is unknown').format(option=args[1])
-                        )
-                    self.options[args[1]] = args[2]
-                # eg. set the help browser
-                #    string help_browser gnome-help
-                elif args[0] == 'string':
-                    if len(args) != 3:
-                        raise SyntaxError(_('Strings must have two arguments'))
-                    self.strings[args[1]] = args[2]
-                    if args[1] == 'difference_colours':
-                        self.setDifferenceColours(args[2])
-                # eg. start a syntax specification for Python
-                #    syntax Python normal text
-                # where 'normal' is the name of the default state and
-                # 'text' is the classification of all characters not
-                # explicitly matched by a syntax highlighting rule
-                elif args[0] == 'syntax':
-                    if len(args) != 3 and len(args) != 4:
-                        raise SyntaxError(_('Syntaxes must have two or three arguments'))
-                    key = args[1]
-                    if len(args) == 2:
-                        # remove file pattern for a syntax specification
-                        try:
-                            del self.syntax_file_patterns[key]
-                        except KeyError:
-                            pass
-                        # remove magic pattern for a syntax specification
-                        try:
-                            del self.syntax_magic_patterns[key]
-                        except KeyError:
-                            pass
-                        # remove a syntax specification
-                        self.current_syntax = None
-                        try:
-                            del self.syntaxes[key]
-                        except KeyError:
-                            pass
-                    else:
-                        self.current_syntax = _SyntaxParser(args[2], args[3])
-                        self.syntaxes[key] = self.current_syntax
-                # eg. transition from state 'normal' to 'comment' when
-                # the pattern '#' is matched and classify the matched
-                # characters as 'python_comment'
-                #    syntax_pattern normal comment python_comment '#'
-                elif args[0] == 'syntax_pattern' and self.current_syntax is not None:
-                    if len(args) < 5:
-                        raise SyntaxError(_('Syntax patterns must have at least four arguments'))
-                    flags = 0
-                    for arg in args[5:]:
-                        if arg == 'ignorecase':
-                            flags |= re.IGNORECASE
-                        else:
-                            raise SyntaxError(_('Value "{value}" is unknown').format(value=arg))
-                    self.current_syntax.addPattern(
-                        args[1],
-                        args[2],
-                        args[3],
-                        re.compile(args[4], flags))
-                # eg. default to the Python syntax rules when viewing
-                # a file ending with '.py' or '.pyw'
-                #    syntax_files Python '\.pyw?$'
-                elif args[0] == 'syntax_files':
-                    if len(args) != 2 and len(args) != 3:
-                        raise SyntaxError(_('Syntax files must have one or two arguments'))
-                    key = args[1]
-                    if len(args) == 2:
-                        # remove file pattern for a syntax specification
-                        try:
-                            del self.syntax_file_patterns[key]
-                        except KeyError:
-                            pass
-                    else:
-                        flags = 0
-                        if utils.isWindows():
-                            flags |= re.IGNORECASE
-                        self.syntax_file_patterns[key] = re.compile(args[2], flags)
-                # eg. default to the Python syntax rules when viewing
-                # a files starting with patterns like #!/usr/bin/python
-                #    syntax_magic Python '^#!/usr/bin/python$'
-                elif args[0] == 'syntax_magic':
-                    if len(args) < 2:
-                        raise SyntaxError(_('Syntax magics must have at least one argument'))
-                    key = args[1]
-                    if len(args) == 2:
-                        # remove magic pattern for a syntax specification
-                        try:
-                            del self.syntax_magic_patterns[key]
-                        except KeyError:
-                            pass
-                    else:
-                        flags = 0
-                        for arg in args[3:]:
-                            if arg == 'ignorecase':
-                                flags |= re.IGNORECASE
-                            else:
-                                raise SyntaxError(
-                                    _('Value "{value}" is unknown').format(value=arg)
-                                )
-                        self.syntax_magic_patterns[key] = re.compile(args[2], flags)
-                else:
+                try:
+                    parser = _KEYWORD_PARSERS[args[0]]
+                except KeyError:
                     raise SyntaxError(_('Keyword "{keyword}" is unknown').format(keyword=args[0]))
+                parser(self, file_name, args)
             except SyntaxError as e:
                 error_msg = _('Syntax error at line {line} of {file}').format(
                     line=i + 1,
@@ -529,9 +242,212 @@ class Resources:
                 error_msg = _('Unhandled error at line {line} of {file}.')
                 utils.logError(error_msg.format(line=i + 1, file=file_name))
 
+    # eg. add Python syntax highlighting:
+    #    import /usr/share/diffuse/syntax/python.syntax
+    def _parseImport(self, file_name: str, args: List[str]) -> None:
+        if len(args) != 2:
+            raise SyntaxError(_('Imports must have one argument'))
+        path = os.path.expanduser(args[1])
+        # relative paths are relative to the parsed file
+        path = os.path.join(utils.globEscape(os.path.dirname(file_name)), path)
+        paths = glob.glob(path)
+        if len(paths) == 0:
+            paths = [path]
+        for path in paths:
+            # convert to absolute path so the location of
+            # any processing errors are reported with
+            # normalized file names
+            self.parse(os.path.abspath(path))
+
+    # eg. make Ctrl+o trigger the open_file menu item
+    #    keybinding menu open_file Ctrl+o
+    def _parseKeyBinding(self, file_name: str, args: List[str]) -> None:
+        if len(args) != 4:
+            raise SyntaxError(_('Key bindings must have three arguments'))
+        self.setKeyBinding(args[1], args[2], args[3])
+
+    # eg. set the regular background colour to white
+    #    colour text_background 1.0 1.0 1.0
+    def _parseColour(self, file_name: str, args: List[str]) -> None:
+        if len(args) != 5:
+            raise SyntaxError(_('Colors must have four arguments'))
+        self.colours[args[1]] = _Colour(float(args[2]), float(args[3]), float(args[4]))
+
+    # eg. set opacity of the line_selection colour
+    #    float line_selection_opacity 0.4
+    def _parseFloat(self, file_name: str, args: List[str]) -> None:
+        if len(args) != 3:
+            raise SyntaxError(_('Floats must have two arguments'))
+        self.floats[args[1]] = float(args[2])
+
+    # eg. enable option log_print_output
+    #    option log_print_output true
+    def _parseOption(self, file_name: str, args: List[str]) -> None:
+        if len(args) != 3:
+            raise SyntaxError(_('Options must have two arguments'))
+        if args[1] not in self.options:
+            raise SyntaxError(
+                _('Option "{option}" is unknown').format(option=args[1])
+            )
+        self.options[args[1]] = args[2]
+
+    # eg. set the help browser
+    #    string help_browser gnome-help
+    def _parseString(self, file_name: str, args: List[str]) -> None:
+        if len(args) != 3:
+            raise SyntaxError(_('Strings must have two arguments'))
+        self.strings[args[1]] = args[2]
+        if args[1] == 'difference_colours':
+            self.setDifferenceColours(args[2])
+
+    # eg. start a syntax specification for Python
+    #    syntax Python normal text
+    # where 'normal' is the name of the default state and
+    # 'text' is the classification of all characters not
+    # explicitly matched by a syntax highlighting rule
+    def _parseSyntax(self, file_name: str, args: List[str]) -> None:
+        if len(args) != 3 and len(args) != 4:
+            raise SyntaxError(_('Syntaxes must have two or three arguments'))
+        key = args[1]
+        if len(args) == 2:
+            # remove file pattern for a syntax specification
+            try:
+                del self.syntax_file_patterns[key]
+            except KeyError:
+                pass
+            # remove magic pattern for a syntax specification
+            try:
+                del self.syntax_magic_patterns[key]
+            except KeyError:
+                pass
+            # remove a syntax specification
+            self.current_syntax = None
+            try:
+                del self.syntaxes[key]
+            except KeyError:
+                pass
+        else:
+            self.current_syntax = _SyntaxParser(args[2], args[3])
+            self.syntaxes[key] = self.current_syntax
+
+    # eg. transition from state 'normal' to 'comment' when
+    # the pattern '#' is matched and classify the matched
+    # characters as 'python_comment'
+    #    syntax_pattern normal comment python_comment '#'
+    def _parseSyntaxPattern(self, file_name: str, args: List[str]) -> None:
+        if self.current_syntax is None:
+            raise SyntaxError(_('Keyword "{keyword}" is unknown').format(keyword=args[0]))
+        if len(args) < 5:
+            raise SyntaxError(_('Syntax patterns must have at least four arguments'))
+        flags = 0
+        for arg in args[5:]:
+            if arg == 'ignorecase':
+                flags |= re.IGNORECASE
+            else:
+                raise SyntaxError(_('Value "{value}" is unknown').format(value=arg))
+        self.current_syntax.addPattern(
+            args[1],
+            args[2],
+            args[3],
+            _compileRegex(args[4], flags))
+
+    # eg. default to the Python syntax rules when viewing
+    # a file ending with '.py' or '.pyw'
+    #    syntax_files Python '\.pyw?$'
+    def _parseSyntaxFiles(self, file_name: str, args: List[str]) -> None:
+        if len(args) != 2 and len(args) != 3:
+            raise SyntaxError(_('Syntax files must have one or two arguments'))
+        key = args[1]
+        if len(args) == 2:
+            # remove file pattern for a syntax specification
+            try:
+                del self.syntax_file_patterns[key]
+            except KeyError:
+                pass
+        else:
+            flags = 0
+            if utils.isWindows():
+                flags |= re.IGNORECASE
+            self.syntax_file_patterns[key] = _compileRegex(args[2], flags)
+
+    # eg. default to the Python syntax rules when viewing
+    # a files starting with patterns like #!/usr/bin/python
+    #    syntax_magic Python '^#!/usr/bin/python$'
+    def _parseSyntaxMagic(self, file_name: str, args: List[str]) -> None:
+        if len(args) < 2:
+            raise SyntaxError(_('Syntax magics must have at least one argument'))
+        key = args[1]
+        if len(args) == 2:
+            # remove magic pattern for a syntax specification
+            try:
+                del self.syntax_magic_patterns[key]
+            except KeyError:
+                pass
+        else:
+            flags = 0
+            for arg in args[3:]:
+                if arg == 'ignorecase':
+                    flags |= re.IGNORECASE
+                else:
+                    raise SyntaxError(
+                        _('Value "{value}" is unknown').format(value=arg)
+                    )
+            self.syntax_magic_patterns[key] = _compileRegex(args[2], flags)
+
+
+# handlers for each keyword of a resource file
+_KEYWORD_PARSERS: Final = {
+    'import': Resources._parseImport,
+    'keybinding': Resources._parseKeyBinding,
+    'colour': Resources._parseColour,
+    'color': Resources._parseColour,
+    'float': Resources._parseFloat,
+    'option': Resources._parseOption,
+    'string': Resources._parseString,
+    'syntax': Resources._parseSyntax,
+    'syntax_pattern': Resources._parseSyntaxPattern,
+    'syntax_files': Resources._parseSyntaxFiles,
+    'syntax_magic': Resources._parseSyntaxMagic
+}
+
+# compiled regular expressions keyed by their pattern and flags so syntaxes
+# sharing a pattern also share the compiled object
+_REGEX_CACHE: Final[Dict[Tuple[str, int], Pattern]] = {}
+
+
+def _compileRegex(pattern: str, flags: int) -> Pattern:
+    key = (pattern, flags)
+    regex = _REGEX_CACHE.get(key)
+    if regex is None:
+        regex = _REGEX_CACHE[key] = re.compile(pattern, flags)
+    return regex
+
+
+# a resource file argument using only simple quoting, matched without shlex
+_SIMPLE_ARG: Final = r'''(?:[^ \t\r\n'"\\#]|'[^']*'|"[^"\\]*")+'''
+_SIMPLE_ARG_PATTERN: Final = re.compile(_SIMPLE_ARG)
+_SIMPLE_LINE_PATTERN: Final = re.compile(
+    rf'[ \t\r\n]*((?:{_SIMPLE_ARG}(?:[ \t\r\n]+{_SIMPLE_ARG})*)?)[ \t\r\n]*(?:#.*)?')
+_QUOTED_PATTERN: Final = re.compile(r''''[^']*'|"[^"]*"''')
+
+
+# split a line of a resource file into arguments in the same way as
+# shlex.split(s, True), handling the common case without the shlex module
+def _splitArgs(s: str) -> List[str]:
+    m = _SIMPLE_LINE_PATTERN.fullmatch(s)
+    if m is None:
+        return shlex.split(s, True)
+    args = _SIMPLE_ARG_PATTERN.findall(m.group(1))
+    for i, arg in enumerate(args):
+        if '"' in arg or "'" in arg:
+            args[i] = _QUOTED_PATTERN.sub(lambda q: q.group()[1:-1], arg)
+    return args
+
 
 # colour resources
 class _Colour:
+    __slots__ = ('red', 'green', 'blue', 'alpha')
+
     def __init__(self, r: float, g: float, b: float, a: float = 1.0):
         # the individual colour components as floats in the range [0, 1]
         self.red = r
@@ -551,9 +467,14 @@ class _Colour:
             self.blue + other.blue,
             self.alpha + other.alpha)
 
-    # over operator
+    # over operator, computed without creating the intermediate scaled colour
     def over(self, other):
-        return self + other * (1 - self.alpha)
+        s = 1 - self.alpha
+        return _Colour(
+            self.red + s * other.red,
+            self.green + s * other.green,
+            self.blue + s * other.blue,
+            self.alpha + s * other.alpha)
 
 
 # class to build and run a finite state machine for identifying syntax tokens
@@ -570,6 +491,9 @@ class _SyntaxParser:
         # tuples indicating the new state for the state machine when 'pattern'
         # is matched and how to classify the matched characters
         self.transitions_lookup: Dict[str, List[Tuple[Pattern, str, str]]] = {initial_state: []}
+        # cache of the combined pattern built by _compileState() for each state
+        self._compiled: Dict[
+            str, Tuple[Optional[Pattern], Sequence[Optional[Tuple[Pattern, str, str]]]]] = {}
 
     # Adds a new edge to the finite state machine from prev_state to
     # next_state.  Characters will be identified as token_type when pattern is
@@ -582,24 +506,84 @@ class _SyntaxParser:
             next_state: str,
             token_type: str,
             pattern: Pattern) -> None:
-        for state in prev_state, next_state:
-            if state not in self.transitions_lookup:
-                self.transitions_lookup[state] = []
-        self.transitions_lookup[prev_state].append((pattern, token_type, next_state))
+        lookup = self.transitions_lookup
+        lookup.setdefault(next_state, [])
+        lookup.setdefault(prev_state, []).append((pattern, token_type, next_state))
+        self._compiled.pop(prev_state, None)
+
+    # Combines the patterns for the edges leaving 'state_name' into a single
+    # regular expression of the form '(p0)|(p1)|...' so the regex engine picks
+    # the first matching edge instead of testing each pattern from Python.
+    # The edges are returned indexed by the number of their enclosing group.
+    # None is returned in place of the combined pattern and the edges are
+    # returned unchanged when the patterns cannot be safely merged (eg. they
+    # use back references that depend on their own group numbering).
+    def _compileState(
+            self,
+            state_name: str
+    ) -> Tuple[Optional[Pattern], Sequence[Optional[Tuple[Pattern, str, str]]]]:
+        try:
+            return self._compiled[state_name]
+        except KeyError:
+            pass
+        transitions = self.transitions_lookup[state_name]
+        result: Tuple[
+            Optional[Pattern], Sequence[Optional[Tuple[Pattern, str, str]]]] = (None, transitions)
+        alternatives: List[str] = []
+        edges: List[Optional[Tuple[Pattern, str, str]]] = [None]
+        for transition in transitions:
+            pattern = transition[0]
+            flags = pattern.flags & ~re.UNICODE
+            if (
+                flags & ~_SCOPED_FLAGS_MASK or
+                _UNMERGEABLE_PATTERN.search(pattern.pattern)
+            ):
+                break
+            scoped = ''.join([c for c, f in _SCOPED_FLAGS if flags & f])
+            if scoped:
+                alternatives.append(f'((?{scoped}:{pattern.pattern}))')
+            else:
+                alternatives.append(f'({pattern.pattern})')
+            edges.append(transition)
+            edges.extend([None] * pattern.groups)
+        else:
+            if alternatives:
+                try:
+                    result = (re.compile('|'.join(alternatives)), edges)
+                except re.error:
+                    pass
+        self._compiled[state_name] = result
+        return result
 
     # given a string and an initial state, identify the final state and tokens
     def parse(self, state_name, s):
-        transitions, blocks, start = self.transitions_lookup[state_name], [], 0
-        while start < len(s):
-            for pattern, token_type, next_state in transitions:
-                m = pattern.match(s, start)
+        compiled, compileState = self._compiled, self._compileState
+        blocks, start, n = [], 0, len(s)
+        combined, transitions = compileState(state_name)
+        while start < n:
+            if combined is not None:
+                # the enclosing group closes last so it identifies the edge
+                m = combined.match(s, start)
                 if m is not None:
-                    end, state_name = m.span()[1], next_state
-                    transitions = self.transitions_lookup[state_name]
-                    break
+                    _, token_type, state_name = transitions[m.lastindex]
+            else:
+                for pattern, token_type, next_state in transitions:
+                    m = pattern.match(s, start)
+                    if m is not None:
+                        state_name = next_state
+                        break
+                else:
+                    m = None
+            if m is not None:
+                end = m.end()
+                # avoid calling _compileState() for states already compiled
+                entry = compiled.get(state_name)
+                if entry is None:
+                    entry = compileState(state_name)
+                combined, transitions = entry
             else:
                 end, token_type = start + 1, self.default_token_type
-            if len(blocks) > 0 and blocks[-1][2] == token_type:
+            if blocks and blocks[-1][2] == token_type:
                 blocks[-1][1] = end
             else:
                 blocks.append([start, end, token_type])
@@ -607,4 +591,186 @@ class _SyntaxParser:
         return state_name, blocks
 
 
+# modifier used by the default key bindings
+_DEFAULT_MOD_KEY: Final = 'Cmd+' if platform.system() == 'Darwin' else 'Ctrl+'
+
+# default key bindings as (context, action, key binding) tuples
+_DEFAULT_KEY_BINDINGS: Final = (
+    ('menu', 'open-file', _DEFAULT_MOD_KEY + 'o'),
+    ('menu', 'open-file-in-new-tab', _DEFAULT_MOD_KEY + 't'),
+    ('menu', 'open-modified-files', 'Shift+Ctrl+O'),
+    ('menu', 'open-commit', 'Shift+Ctrl+T'),
+    ('menu', 'reload-file', 'Shift+Ctrl+R'),
+    ('menu', 'save-file', _DEFAULT_MOD_KEY + 's'),
+    ('menu', 'save-file-as', _DEFAULT_MOD_KEY + 'Shift+A'),
+    ('menu', 'save-all', _DEFAULT_MOD_KEY + 'Shift+S'),
+    ('menu', 'new-2-way-file-merge', 'Ctrl+2'),
+    ('menu', 'new-3-way-file-merge', 'Ctrl+3'),
+    ('menu', 'new-n-way-file-merge', 'Ctrl+4'),
+    ('menu', 'close-tab', _DEFAULT_MOD_KEY + 'w'),
+    ('menu', 'undo-close-tab', _DEFAULT_MOD_KEY + 'Shift+W'),
+    ('menu', 'quit', _DEFAULT_MOD_KEY + 'q'),
+    ('menu', 'undo', _DEFAULT_MOD_KEY + 'z'),
+    ('menu', 'redo', _DEFAULT_MOD_KEY + 'Shift+Z'),
+    ('menu', 'cut', _DEFAULT_MOD_KEY + 'x'),
+    ('menu', 'copy', _DEFAULT_MOD_KEY + 'c'),
+    ('menu', 'paste', _DEFAULT_MOD_KEY + 'v'),
+    ('menu', 'select-all', _DEFAULT_MOD_KEY + 'a'),
+    ('menu', 'clear-edits', _DEFAULT_MOD_KEY + 'r'),
+    ('menu', 'dismiss-all-edits', _DEFAULT_MOD_KEY + 'd'),
+    ('menu', 'find', _DEFAULT_MOD_KEY + 'f'),
+    ('menu', 'find-next', _DEFAULT_MOD_KEY + 'g'),
+    ('menu', 'find-previous', _DEFAULT_MOD_KEY + 'Shift+G'),
+    ('menu', 'go-to-line', _DEFAULT_MOD_KEY + 'Shift+l'),
+    ('menu', 'realign-all', _DEFAULT_MOD_KEY + 'l'),
+    ('menu', 'isolate', _DEFAULT_MOD_KEY + 'i'),
+    ('menu', 'first-difference', _DEFAULT_MOD_KEY + 'Shift+Up'),
+    ('menu', 'previous-difference', _DEFAULT_MOD_KEY + 'Up'),
+    ('menu', 'next-difference', _DEFAULT_MOD_KEY + 'Down'),
+    ('menu', 'last-difference', _DEFAULT_MOD_KEY + 'Shift+Down'),
+    ('menu', 'first-tab', 'Shift+Ctrl+Page_Up'),
+    ('menu', 'previous-tab', 'Ctrl+Page_Up'),
+    ('menu', 'next-tab', 'Ctrl+Page_Down'),
+    ('menu', 'last-tab', 'Shift+Ctrl+Page_Down'),
+    ('menu', 'shift-pane-right', 'Shift+Ctrl+parenright'),
+    ('menu', 'shift-pane-left', 'Shift+Ctrl+parenleft'),
+    ('menu', 'convert-to-upper-case', _DEFAULT_MOD_KEY + 'u'),
+    ('menu', 'convert-to-lower-case', _DEFAULT_MOD_KEY + 'Shift+U'),
+    ('menu', 'sort-lines-in-ascending-order', _DEFAULT_MOD_KEY + 'y'),
+    ('menu', 'sort-lines-in-descending-order', _DEFAULT_MOD_KEY + 'Shift+Y'),
+    ('menu', 'remove-trailing-white-space', _DEFAULT_MOD_KEY + 'k'),
+    ('menu', 'convert-tabs-to-spaces', _DEFAULT_MOD_KEY + 'b'),
+    ('menu', 'convert-leading-spaces-to-tabs', 'Shift+Ctrl+B'),
+    ('menu', 'increase-indenting', _DEFAULT_MOD_KEY + 'Shift+greater'),
+    ('menu', 'decrease-indenting', _DEFAULT_MOD_KEY + 'Shift+less'),
+    ('menu', 'convert-to-dos', _DEFAULT_MOD_KEY + 'Shift+E'),
+    ('menu', 'convert-to-mac', _DEFAULT_MOD_KEY + 'Shift+C'),
+    ('menu', 'convert-to-unix', _DEFAULT_MOD_KEY + 'e'),
+    ('menu', 'copy-selection-right', _DEFAULT_MOD_KEY + 'Shift+Right'),
+    ('menu', 'copy-selection-left', _DEFAULT_MOD_KEY + 'Shift+Left'),
+    ('menu', 'copy-left-into-selection', _DEFAULT_MOD_KEY + 'Right'),
+    ('menu', 'copy-right-into-selection', _DEFAULT_MOD_KEY + 'Left'),
+    ('menu', 'merge-from-left-then-right', _DEFAULT_MOD_KEY + 'm'),
+    ('menu', 'merge-from-right-then-left', _DEFAULT_MOD_KEY + 'Shift+M'),
+    ('menu', 'help-contents', 'F1'),
+    ('line_mode', 'enter-align-mode', 'space'),
+    ('line_mode', 'enter-character-mode', 'Return'),
+    ('line_mode', 'enter-character-mode', 'KP_Enter'),
+    ('line_mode', 'first-line', 'Home'),
+    ('line_mode', 'first-line', 'g'),
+    ('line_mode', 'extend-first-line', 'Shift+Home'),
+    ('line_mode', 'last-line', 'End'),
+    ('line_mode', 'last-line', 'Shift+G'),
+    ('line_mode', 'extend-last-line', 'Shift+End'),
+    ('line_mode', 'up', 'Up'),
+    ('line_mode', 'up', 'k'),
+    ('line_mode', 'extend-up', 'Shift+Up'),
+    ('line_mode', 'extend-up', 'Shift+K'),
+    ('line_mode', 'down', 'Down'),
+    ('line_mode', 'down', 'j'),
+    ('line_mode', 'extend-down', 'Shift+Down'),
+    ('line_mode', 'extend-down', 'Shift+J'),
+    ('line_mode', 'left', 'Left'),
+    ('line_mode', 'left', 'h'),
+    ('line_mode', 'extend-left', 'Shift+Left'),
+    ('line_mode', 'right', 'Right'),
+    ('line_mode', 'right', 'l'),
+    ('line_mode', 'extend-right', 'Shift+Right'),
+    ('line_mode', 'page-up', 'Page_Up'),
+    ('line_mode', 'page-up', _DEFAULT_MOD_KEY + 'u'),
+    ('line_mode', 'extend-page-up', 'Shift+Page_Up'),
+    ('line_mode', 'extend-page-up', _DEFAULT_MOD_KEY + 'Shift+U'),
+    ('line_mode', 'page-down', 'Page_Down'),
+    ('line_mode', 'page-down', _DEFAULT_MOD_KEY + 'd'),
+    ('line_mode', 'extend-page-down', 'Shift+Page_Down'),
+    ('line_mode', 'extend-page-down', _DEFAULT_MOD_KEY + 'Shift+D'),
+    ('line_mode', 'delete-text', 'BackSpace'),
+    ('line_mode', 'delete-text', 'Delete'),
+    ('line_mode', 'delete-text', 'x'),
+    ('line_mode', 'clear-edits', 'r'),
+    ('line_mode', 'isolate', 'i'),
+    ('line_mode', 'first-difference', 'Ctrl+Home'),
+    ('line_mode', 'first-difference', 'Shift+P'),
+    ('line_mode', 'previous-difference', 'p'),
+    ('line_mode', 'next-difference', 'n'),
+    ('line_mode', 'last-difference', 'Ctrl+End'),
+    ('line_mode', 'last-difference', 'Shift+N'),
+    # ('line_mode', 'copy-selection-right', 'Shift+L'),
+    # ('line_mode', 'copy-selection-left', 'Shift+H'),
+    ('line_mode', 'copy-left-into-selection', 'Shift+L'),
+    ('line_mode', 'copy-right-into-selection', 'Shift+H'),
+    ('line_mode', 'merge-from-left-then-right', 'm'),
+    ('line_mode', 'merge-from-right-then-left', 'Shift+M'),
+    ('align_mode', 'enter-line-mode', 'Escape'),
+    ('align_mode', 'align', 'space'),
+    ('align_mode', 'enter-character-mode', 'Return'),
+    ('align_mode', 'enter-character-mode', 'KP_Enter'),
+    ('align_mode', 'first-line', 'g'),
+    ('align_mode', 'last-line', 'Shift+G'),
+    ('align_mode', 'up', 'Up'),
+    ('align_mode', 'up', 'k'),
+    ('align_mode', 'down', 'Down'),
+    ('align_mode', 'down', 'j'),
+    ('align_mode', 'left', 'Left'),
+    ('align_mode', 'left', 'h'),
+    ('align_mode', 'right', 'Right'),
+    ('align_mode', 'right', 'l'),
+    ('align_mode', 'page-up', 'Page_Up'),
+    ('align_mode', 'page-up', _DEFAULT_MOD_KEY + 'u'),
+    ('align_mode', 'page-down', 'Page_Down'),
+    ('align_mode', 'page-down', _DEFAULT_MOD_KEY + 'd'),
+    ('character_mode', 'enter-line-mode', 'Escape')
+)
+
+# default colours
+_DEFAULT_COLOURS: Final[Dict[str, _Colour]] = {
+    'alignment': _Colour(1.0, 1.0, 0.0),
+    'character_selection': _Colour(0.7, 0.7, 1.0),
+    'cursor': _Colour(0.0, 0.0, 0.0),
+    'difference_1': _Colour(1.0, 0.625, 0.625),
+    'difference_2': _Colour(0.85, 0.625, 0.775),
+    'difference_3': _Colour(0.85, 0.775, 0.625),
+    'hatch': _Colour(0.8, 0.8, 0.8),
+    'line_number': _Colour(0.0, 0.0, 0.0),
+    'line_number_background': _Colour(0.75, 0.75, 0.75),
+    'line_selection': _Colour(0.7, 0.7, 1.0),
+    'map_background': _Colour(0.6, 0.6, 0.6),
+    'margin': _Colour(0.8, 0.8, 0.8),
+    'edited': _Colour(0.5, 1.0, 0.5),
+    'preedit': _Colour(0.0, 0.0, 0.0),
+    'text': _Colour(0.0, 0.0, 0.0),
+    'text_background': _Colour(1.0, 1.0, 1.0)
+}
+
+# default floats
+_DEFAULT_FLOATS: Final[Dict[str, float]] = {
+    'alignment_opacity': 1.0,
+    'character_difference_opacity': 0.4,
+    'character_selection_opacity': 0.4,
+    'edited_opacity': 0.4,
+    'line_difference_opacity': 0.3,
+    'line_selection_opacity': 0.4
+}
+
+# modifier names accepted in key bindings
+_MODIFIER_FLAGS: Final = {
+    'Shift': Gdk.ModifierType.SHIFT_MASK,
+    'Ctrl': Gdk.ModifierType.CONTROL_MASK,
+    'Cmd': Gdk.ModifierType.META_MASK,
+    'Alt': Gdk.ModifierType.MOD1_MASK
+}
+# key values already looked up from Gdk, keyed by key name
+_KEY_CACHE: Dict[str, int] = {}
+
+# inline flags used to scope each pattern's flags within a combined pattern
+_SCOPED_FLAGS: Final = (
+    ('a', re.ASCII),
+    ('i', re.IGNORECASE),
+    ('m', re.MULTILINE),
+    ('s', re.DOTALL)
+)
+_SCOPED_FLAGS_MASK: Final = re.ASCII | re.IGNORECASE | re.MULTILINE | re.DOTALL
+# global inline flags, back references, and conditionals prevent merging patterns
+_UNMERGEABLE_PATTERN: Final = re.compile(r'^\(\?[aiLmsux]+\)|\\\d|\\g<|\(\?P=|\(\?\(')
+
 theResources: Final = Resources()
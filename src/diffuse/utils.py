@@ -17,16 +17,21 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
+import functools
+import glob
+import heapq
 import inspect
 import os
+import re
 import sys
 import locale
+import operator
 import subprocess
 import traceback
 
 from enum import IntFlag
 from gettext import gettext as _
-from typing import Final, List, Optional, TextIO
+from typing import Any, Dict, Final, List, Optional, TextIO
 
 from diffuse import constants
 from diffuse.preferences import Preferences
@@ -69,9 +74,10 @@ class EncodingMenu(Gtk.Box):
         self.combobox.show()
 
     def set_text(self, encoding: Optional[str]) -> None:
-        encoding = norm_encoding(encoding)
-        if encoding in self.encodings:
-            self.combobox.set_active(self.encodings.index(encoding))
+        try:
+            self.combobox.set_active(self.encodings.index(norm_encoding(encoding)))
+        except ValueError:
+            pass
 
     def get_text(self) -> Optional[str]:
         i = self.combobox.get_active()
@@ -126,10 +132,14 @@ def make_subdirs(p: str, ss: List[str]) -> str:
 
 def _drive_from_path(path: str) -> str:
     '''Returns the Windows drive or share from a from an absolute path.'''
-    d = path.split(os.sep)
-    if len(d) > 3 and d[0] == '' and d[1] == '':
-        return os.path.join(*d[:4])
-    return d[0]
+    # only the first few components are needed, avoid splitting the whole path
+    sep = os.sep
+    if path.startswith(sep + sep):
+        i = path.find(sep, 2)
+        if i >= 0:
+            j = path.find(sep, i + 1)
+            return os.path.join(path[2:i], path[i + 1:j] if j >= 0 else path[i + 1:])
+    return path.partition(sep)[0]
 
 
 def relpath(a: str, b: str) -> str:
@@ -161,6 +171,9 @@ def safeRelativePath(abspath1: str, name: str, prefs: Preferences, cygwin_pref:
 
 def _bash_escape(s: str) -> str:
     '''Escape arguments for use with bash.'''
+    if "'" not in s:
+        # most arguments do not contain any quotes
+        return f"'{s}'"
     return "'" + s.replace("'", "'\\''") + "'"
 
 
@@ -185,7 +198,7 @@ def popenRead(
             prefs.convertToNativePath('/bin/bash.exe'),
             '-l',
             '-c',
-            f"cd {_bash_escape(cwd)}; {' '.join([_bash_escape(arg) for arg in cmd])}"
+            f"cd {_bash_escape(cwd)}; {' '.join(map(_bash_escape, cmd))}"
         ]
         opt_cwd = None
 
@@ -221,7 +234,7 @@ def len_minus_line_ending(s: str) -> int:
     n = len(s)
     if s.endswith('\r\n'):
         n -= 2
-    elif s.endswith('\r') or s.endswith('\n'):
+    elif s.endswith(('\r', '\n')):
         n -= 1
     return n
 
@@ -235,7 +248,11 @@ def strip_eol(s: str) -> str:
 
 def _strip_eols(ss: List[str]) -> List[str]:
     '''Returns the list of strings without line ending characters.'''
-    return [strip_eol(s) for s in ss]
+    # same as strip_eol() but inlined as this is applied to every line of a file
+    return [
+        (s[:-2] if s.endswith('\r\n') else s[:-1] if s[-1] in '\r\n' else s) if s else s
+        for s in ss
+    ]
 
 
 # use popen to read the output of a command
@@ -245,54 +262,53 @@ def popenReadLines(
         prefs: Preferences,
         bash_pref: str,
         success_results: Optional[List[int]] = None) -> List[str]:
-    return _strip_eols(splitlines(popenRead(
-        cwd, cmd, prefs, bash_pref, success_results).decode('utf-8', errors='ignore')))
+    return _splitlines_without_eols(popenRead(
+        cwd, cmd, prefs, bash_pref, success_results).decode('utf-8', errors='ignore'))
 
 
 def readconfiglines(fd: TextIO) -> List[str]:
-    return fd.read().replace('\r', '').split('\n')
+    return _splitlines_without_eols(fd.read())
 
 
 def globEscape(s: str) -> str:
     '''Escape special glob characters.'''
-    m = {c: f'[{c}]' for c in '[]?*'}
-    return ''.join([m.get(c, c) for c in s])
+    return glob.escape(s)
+
+
+def merge_file_templates(*templates: Dict[str, Any]) -> List[Any]:
+    '''Returns the values of the dictionaries sorted by key.  Values with the
+       same key are returned in the order of their dictionaries.'''
+    # merging the sorted dictionaries avoids looking up every key in each of
+    # them, heapq.merge() is stable so ties keep the order of the arguments
+    key = operator.itemgetter(0)
+    return [kv[1] for kv in heapq.merge(*(sorted(m.items(), key=key) for m in templates), key=key)]
 
 
 # split string into lines based upon DOS, Mac, and Unix line endings
 def splitlines(text: str) -> List[str]:
-    # split on new line characters
-    temp, i, n = [], 0, len(text)
-    while i < n:
-        j = text.find('\n', i)
-        if j < 0:
-            temp.append(text[i:])
-            break
-        j += 1
-        temp.append(text[i:j])
-        i = j
-    # split on carriage return characters
-    ss = []
-    for s in temp:
-        i, n = 0, len(s)
-        while i < n:
-            j = s.find('\r', i)
-            if j < 0:
-                ss.append(s[i:])
-                break
-            j += 1
-            if j < n and s[j] == '\n':
-                j += 1
-            ss.append(s[i:j])
-            i = j
-    return ss
+    # str.splitlines() also breaks lines on characters such as form feeds so it
+    # is only used when none of those are present
+    for c in _OTHER_LINE_BREAKS:
+        if c in text:
+            return _LINE_PATTERN.findall(text)
+    return text.splitlines(True)
+
+
+def _splitlines_without_eols(text: str) -> List[str]:
+    '''Returns the lines of the string without their line ending characters.'''
+    # same as _strip_eols(splitlines(text)) but without the intermediate list
+    for c in _OTHER_LINE_BREAKS:
+        if c in text:
+            return _strip_eols(_LINE_PATTERN.findall(text))
+    return text.splitlines()
 
 
 # also recognize old Mac OS line endings
 def readlines(fd: TextIO) -> List[str]:
-    return _strip_eols(splitlines(fd.read()))
+    return _splitlines_without_eols(fd.read())
 
 
+@functools.lru_cache(maxsize=256)
 def norm_encoding(e: Optional[str]) -> Optional[str]:
     '''Map an encoding name to its standard form.'''
     if e is not None:
@@ -308,11 +324,10 @@ def null_to_empty(s: Optional[str]) -> str:
 
 # utility method to step advance an adjustment
 def step_adjustment(adj: Gtk.Adjustment, delta: int) -> None:
-    v = adj.get_value() + delta
-    # clamp to the allowed range
-    v = max(v, int(adj.get_lower()))
-    v = min(v, int(adj.get_upper() - adj.get_page_size()))
-    adj.set_value(v)
+    # Gtk.Adjustment.set_value() already clamps the value to the range from
+    # the lower bound to the upper bound minus the page size so the bounds do
+    # not need to be fetched for every scroll event
+    adj.set_value(adj.get_value() + delta)
 
 
 def _get_default_lang() -> Optional[str]:
@@ -348,6 +363,10 @@ class LineEnding(IntFlag):
 # this is sorted based upon frequency to speed up code for stripping whitespace
 whitespace: Final[str] = ' \t\n\r\x0b\x0c'
 
+# line breaks recognised by str.splitlines() other than DOS, Mac, and Unix line endings
+_OTHER_LINE_BREAKS: Final[str] = '\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+_LINE_PATTERN: Final = re.compile('[^\r\n]*(?:\r\n?|\n)|[^\r\n]+')
+
 # use the program's location as a starting place to search for supporting files
 # such as icon and help documentation
 app_path: Final[str] = sys.executable if hasattr(sys, 'frozen') else os.path.realpath(sys.argv[0])
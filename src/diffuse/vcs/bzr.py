@@ -104,14 +104,7 @@ class Bzr(VcsInterface):
                                     k1 = utils.relpath(pwd, k1)
                                 renamed[k1] = [(k0, prev), (k1, rev)]
         # sort the results
-        result, r = [], set()
-        for m in removed, added, modified, renamed:
-            r.update(m.keys())
-        for k in sorted(r):
-            for m in removed, added, modified, renamed:
-                if k in m:
-                    result.append(m[k])
-        return result
+        return utils.merge_file_templates(removed, added, modified, renamed)
 
     def getFolderTemplate(self, prefs, names):
         # build command
@@ -172,14 +165,7 @@ class Bzr(VcsInterface):
                                 k1 = utils.relpath(pwd, k1)
                             renamed[k1] = [(k0, prev), (k1, None)]
         # sort the results
-        result, r = [], set()
-        for m in removed, added, modified, renamed:
-            r.update(m.keys())
-        for k in sorted(r):
-            for m in removed, added, modified, renamed:
-                if k in m:
-                    result.append(m[k])
-        return result
+        return utils.merge_file_templates(removed, added, modified, renamed)
 
     def getRevision(self, prefs: Preferences, name: str, rev: str) -> bytes:
         return utils.popenRead(
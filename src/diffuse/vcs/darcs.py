@@ -123,14 +123,7 @@ class Darcs(VcsInterface):
                                 k1 = utils.relpath(pwd, k1)
                             renamed[k1] = [(k0, prev), (k1, rev)]
         # sort the results
-        result, r = [], set()
-        for m in added, modified, removed, renamed:
-            r.update(m.keys())
-        for k in sorted(r):
-            for m in removed, added, modified, renamed:
-                if k in m:
-                    result.append(m[k])
-        return result
+        return utils.merge_file_templates(removed, added, modified, renamed)
 
     def getCommitTemplate(self, prefs, rev, names):
         return self._getCommitTemplate(prefs, names, rev)
@@ -19,6 +19,7 @@
 
 import os
 
+from bisect import bisect_right
 from typing import List
 
 
@@ -30,20 +31,25 @@ class FolderSet:
     '''
 
     def __init__(self, names: List[str]) -> None:
-        self.folders: List[str] = []
+        folders: List[str] = []
         for name in names:
             name = os.path.abspath(name)
             # ensure all names end with os.sep
             if not name.endswith(os.sep):
                 name += os.sep
-            self.folders.append(name)
+            folders.append(name)
+        # keep the folders sorted without any folder nested inside another so
+        # the only candidate containing a path is the last folder sorting
+        # before it
+        self.folders: List[str] = []
+        for name in sorted(folders):
+            if not self.folders or not name.startswith(self.folders[-1]):
+                self.folders.append(name)
 
     # returns True if the given abspath is a file that should be included in
     # the interesting file subset
     def contains(self, abspath: str) -> bool:
         if not abspath.endswith(os.sep):
             abspath += os.sep
-        for f in self.folders:
-            if abspath.startswith(f):
-                return True
-        return False
+        i = bisect_right(self.folders, abspath)
+        return i > 0 and abspath.startswith(self.folders[i - 1])
@@ -140,7 +140,6 @@ class Mtn(VcsInterface):
 
     def getFolderTemplate(self, prefs, names):
         fs = FolderSet(names)
-        result = []
         pwd, isabs = os.path.abspath(os.curdir), False
         args = [
             prefs.getString('mtn_bin'),
@@ -209,14 +208,7 @@ class Mtn(VcsInterface):
                             k = utils.relpath(pwd, k)
                         modified[k] = [(k, prev), (k, None)]
         # sort the results
-        r = set()
-        for m in removed, added, modified, renamed:
-            r.update(m.keys())
-        for k in sorted(r):
-            for m in removed, added, modified, renamed:
-                if k in m:
-                    result.append(m[k])
-        return result
+        return utils.merge_file_templates(removed, added, modified, renamed)
 
     def getRevision(self, prefs: Preferences, name: str, rev: str) -> bytes:
         return utils.popenRead(
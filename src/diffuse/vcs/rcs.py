@@ -108,19 +108,22 @@ class Rcs(VcsInterface):
                     recurse = os.path.isdir(os.path.join(s, 'RCS'))
                     if ex or recurse:
                         ex = False
-                        for d in os.listdir(s):
-                            dn = os.path.join(s, d)
-                            if d.endswith(',v') and os.path.isfile(dn):
-                                # map to checkout name
-                                r.append(dn[:-2])
-                            elif d == 'RCS' and os.path.isdir(dn):
-                                for v in os.listdir(dn):
-                                    if os.path.isfile(os.path.join(dn, v)):
-                                        if v.endswith(',v'):
-                                            v = v[:-2]
-                                        r.append(os.path.join(s, v))
-                            elif recurse and os.path.isdir(dn) and not os.path.islink(dn):
-                                n.append(dn)
+                        with os.scandir(s) as entries:
+                            for entry in entries:
+                                d, dn = entry.name, entry.path
+                                if d.endswith(',v') and entry.is_file():
+                                    # map to checkout name
+                                    r.append(dn[:-2])
+                                elif d == 'RCS' and entry.is_dir():
+                                    with os.scandir(dn) as versions:
+                                        for version in versions:
+                                            if version.is_file():
+                                                v = version.name
+                                                if v.endswith(',v'):
+                                                    v = v[:-2]
+                                                r.append(os.path.join(s, v))
+                                elif recurse and entry.is_dir(follow_symlinks=False):
+                                    n.append(dn)
             else:
                 # the user specified a file
                 s = k + ',v'
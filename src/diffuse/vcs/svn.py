@@ -20,8 +20,9 @@
 import os
 import glob
 
+from concurrent.futures import ThreadPoolExecutor
 from gettext import gettext as _
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 
 from diffuse import utils
 from diffuse.preferences import Preferences
@@ -31,9 +32,14 @@ from diffuse.vcs.vcs_interface import VcsInterface
 
 # Subversion support
 class Svn(VcsInterface):
+    # number of "svn cat" commands run at the same time by getRevisions()
+    _MAX_CAT_WORKERS = 4
+
     def __init__(self, root: str):
         super().__init__(root)
         self.url: Optional[str] = None
+        # True once "svn info" has been run, even if it did not report a URL
+        self._url_queried = False
 
     @staticmethod
     def _getVcs() -> str:
@@ -61,7 +67,7 @@ class Svn(VcsInterface):
         return str(max(m > 1, 0))
 
     def _getURL(self, prefs: Preferences) -> Optional[str]:
-        if self.url is None:
+        if not self._url_queried:
             vcs, prefix = self._getVcs(), self._getURLPrefix()
             n = len(prefix)
             args = [prefs.getString(vcs + '_bin'), 'info']
@@ -69,6 +75,7 @@ class Svn(VcsInterface):
                 if s.startswith(prefix):
                     self.url = s[n:]
                     break
+            self._url_queried = True
         return self.url
 
     def getFileTemplate(self, prefs: Preferences, name: str) -> VcsInterface.PathRevisionList:
@@ -88,6 +95,22 @@ class Svn(VcsInterface):
         # default case
         return [(name, self._getPreviousRevision(None)), (name, None)]
 
+    # returns the URL of the repository folder 'p'
+    @staticmethod
+    def _getFolderURL(url: Optional[str], p: str) -> str:
+        # Subversion URLs always use '/' to separate folders
+        if os.sep != '/':
+            p = p.replace(os.sep, '/')
+        return f'{url}/{p}'
+
+    # returns the folder that names listed for the repository folder 'p' are
+    # relative to, the relative path is computed once for all of the names
+    def _getResultBase(self, p: str, pwd: str, isabs: bool) -> str:
+        base = os.path.join(self.root, p)
+        if not isabs:
+            base = utils.relpath(pwd, base)
+        return base
+
     def _getCommitTemplate(self, prefs, rev, names):
         result = []
         try:
@@ -167,6 +190,7 @@ class Svn(VcsInterface):
                         del m[d]
             # determine which are directories
             added = {}
+            url = self._getURL(prefs)
             for p, v in m.items():
                 lines = utils.popenReadLines(
                     self.root,
@@ -175,16 +199,15 @@ class Svn(VcsInterface):
                         'list',
                         '-r',
                         rev,
-                        f"{self._getURL(prefs)}/{p.replace(os.sep, '/')}"
+                        self._getFolderURL(url, p)
                     ],
                     prefs,
                     vcs_bash)
+                base = self._getResultBase(p, pwd, isabs)
                 for s in lines:
                     if s in v:
                         # confirmed as added file
-                        k = os.path.join(self.root, os.path.join(p, s))
-                        if not isabs:
-                            k = utils.relpath(pwd, k)
+                        k = os.path.join(base, s)
                         added[k] = [(None, None), (k, rev)]
         # determine if removed items are files or directories
         if prev == 'BASE':
@@ -203,7 +226,9 @@ class Svn(VcsInterface):
                 if d not in m:
                     m[d] = set()
                 m[d].add(b)
-            removed_dir, removed = set(), {}
+            # maps removed directories to their URLs
+            removed_dir, removed = {}, {}
+            url = self._getURL(prefs)
             for p, v in m.items():
                 lines = utils.popenReadLines(
                     self.root,
@@ -212,58 +237,49 @@ class Svn(VcsInterface):
                         'list',
                         '-r',
                         prev,
-                        f"{self._getURL(prefs)}/{p.replace(os.sep, '/')}"
+                        self._getFolderURL(url, p)
                     ],
                     prefs,
                     vcs_bash)
+                base = self._getResultBase(p, pwd, isabs)
                 for s in lines:
                     if s.endswith('/'):
                         s = s[:-1]
                         if s in v:
                             # confirmed item as directory
-                            removed_dir.add(os.path.join(p, s))
+                            d = os.path.join(p, s)
+                            removed_dir[d] = self._getFolderURL(url, d)
                     else:
                         if s in v:
                             # confirmed item as file
-                            k = os.path.join(self.root, os.path.join(p, s))
-                            if not isabs:
-                                k = utils.relpath(pwd, k)
-                            removed[k] = [(k, prev), (None, None)]
-            # recursively find all unreported removed files
-            while removed_dir:
-                tmp = removed_dir
-                removed_dir = set()
-                for p in tmp:
-                    lines = utils.popenReadLines(
-                        self.root,
-                        [
-                            vcs_bin,
-                            'list',
-                            '-r',
-                            prev,
-                            f"{self._getURL(prefs)}/{p.replace(os.sep, '/')}"
-                        ],
-                        prefs,
-                        vcs_bash)
-                    for s in lines:
-                        if s.endswith('/'):
-                            # confirmed item as directory
-                            removed_dir.add(os.path.join(p, s[:-1]))
-                        else:
-                            # confirmed item as file
-                            k = os.path.join(self.root, os.path.join(p, s))
-                            if not isabs:
-                                k = utils.relpath(pwd, k)
+                            k = os.path.join(base, s)
                             removed[k] = [(k, prev), (None, None)]
+            # find all unreported removed files, a recursive listing of each
+            # removed directory avoids running svn for every sub-directory
+            for p, dir_url in removed_dir.items():
+                lines = utils.popenReadLines(
+                    self.root,
+                    [
+                        vcs_bin,
+                        'list',
+                        '-R',
+                        '-r',
+                        prev,
+                        dir_url
+                    ],
+                    prefs,
+                    vcs_bash)
+                for s in lines:
+                    if not s.endswith('/'):
+                        # confirmed item as file, the listing can reach back
+                        # into the current folder so the name is made
+                        # relative from the full path
+                        k = os.path.join(self.root, p, s.replace('/', os.sep))
+                        if not isabs:
+                            k = utils.relpath(pwd, k)
+                        removed[k] = [(k, prev), (None, None)]
         # sort the results
-        r = set()
-        for m in removed, added, modified:
-            r.update(m.keys())
-        for k in sorted(r):
-            for m in removed, added, modified:
-                if k in m:
-                    result.append(m[k])
-        return result
+        return utils.merge_file_templates(removed, added, modified)
 
     def getCommitTemplate(self, prefs, rev, names):
         return self._getCommitTemplate(prefs, rev, names)
@@ -295,3 +311,32 @@ class Svn(VcsInterface):
             ],
             prefs,
             'svn_bash')
+
+    def getRevisions(
+            self,
+            prefs: Preferences,
+            specs: VcsInterface.PathRevisionList) -> Dict[VcsInterface.PathRevisionPair, bytes]:
+        result: Dict[VcsInterface.PathRevisionPair, bytes] = {}
+        if len(specs) < 2:
+            return result
+        try:
+            # look up the repository URL before the worker threads need it
+            if any(spec[1] not in ['BASE', 'COMMITTED', 'PREV'] for spec in specs):
+                self._getURL(prefs)
+        except (IOError, OSError):
+            return result
+        # each "svn cat" pays for starting svn and a round trip to the server
+        # so run a few of them at once
+        with ThreadPoolExecutor(max_workers=self._MAX_CAT_WORKERS) as executor:
+            futures = [
+                ((name, rev), executor.submit(self.getRevision, prefs, name, rev))
+                for name, rev in specs
+                if name is not None and rev is not None
+            ]
+            for spec, future in futures:
+                try:
+                    result[spec] = future.result()
+                except (IOError, OSError):
+                    # getRevision() will report the error when the file is loaded
+                    pass
+        return result
@@ -18,7 +18,7 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 from abc import ABCMeta, abstractmethod
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from diffuse.preferences import Preferences
 
@@ -49,3 +49,12 @@ class VcsInterface(metaclass=ABCMeta):
     @abstractmethod
     def getRevision(self, prefs: Preferences, name: str, rev: str) -> bytes:
         """Returns the contents of the specified file revision"""
+
+    def getRevisions(
+            self,
+            prefs: Preferences,
+            specs: PathRevisionList) -> Dict[PathRevisionPair, bytes]:
+        """Returns the contents of several file revisions at once.  Revisions that
+           could not be retrieved are left out so callers can fall back to
+           getRevision() for them.  By default nothing is retrieved in advance."""
+        return {}
@@ -17,45 +17,54 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
+import functools
 import os
 
-from typing import List, Optional
+from typing import Callable, Dict, Final, FrozenSet, List, Optional, Tuple
 
 from diffuse import utils
 from diffuse.preferences import Preferences
 from diffuse.vcs.vcs_interface import VcsInterface
-from diffuse.vcs.bzr import Bzr
-from diffuse.vcs.cvs import Cvs
-from diffuse.vcs.darcs import Darcs
-from diffuse.vcs.git import Git
-from diffuse.vcs.hg import Hg
-from diffuse.vcs.mtn import Mtn
-from diffuse.vcs.rcs import Rcs
-from diffuse.vcs.svn import Svn
+
+# signature of the functions looking for a repository of a particular VCS
+_RepoProbe = Callable[[str, Dict[str, str], Preferences], Optional[VcsInterface]]
 
 
 class VcsRegistry:
     def __init__(self) -> None:
-        # initialise the VCS objects
-        self._get_repo = {
-            'bzr': _get_bzr_repo,
-            'cvs': _get_cvs_repo,
-            'darcs': _get_darcs_repo,
-            'git': _get_git_repo,
-            'hg': _get_hg_repo,
-            'mtn': _get_mtn_repo,
-            'rcs': _get_rcs_repo,
-            'svn': _get_svn_repo
-        }
+        # the probe that found the work area of each folder, keyed by the
+        # folder and search order
+        #
+        # the probe is remembered rather than its result so each caller still
+        # gets a new VcsInterface without any state cached by a previous one
+        self._folder_cache: Dict[Tuple[str, str], Optional[_RepoProbe]] = {}
+
+    # forgets the work areas found so far so work areas created or removed
+    # since then are noticed, called when the user opens or reloads files and
+    # when the preferences change
+    def clear(self) -> None:
+        self._folder_cache.clear()
+        _find_vcs_roots.cache_clear()
 
     # determines which VCS to use for files in the named folder
     def findByFolder(self, path: str, prefs: Preferences) -> Optional[VcsInterface]:
         path = os.path.abspath(path)
-        for vcs in prefs.getString('vcs_search_order').split():
-            if vcs in self._get_repo:
-                repo = self._get_repo[vcs](path, prefs)
-                if repo:
-                    return repo
+        search_order = prefs.getString('vcs_search_order')
+        roots = _find_vcs_roots(path)
+        key = (path, search_order)
+        if key in self._folder_cache:
+            get_repo = self._folder_cache[key]
+            if get_repo is None:
+                return None
+            repo = get_repo(path, roots, prefs)
+            if repo:
+                return repo
+        for get_repo in _get_probe_order(search_order):
+            repo = get_repo(path, roots, prefs)
+            if repo:
+                self._folder_cache[key] = get_repo
+                return repo
+        self._folder_cache[key] = None
         return None
 
     # determines which VCS to use for the named file
@@ -65,34 +74,80 @@ class VcsRegistry:
         return None
 
 
+# names of the files and folders marking a version control system's work area
+_VCS_MARKERS: Final[FrozenSet[str]] = frozenset((
+    '.bzr', 'CVS', '_darcs', '.git', '.hg', '_MTN', 'RCS', '.svn'))
+
+# markers that are also looked for in the parents of a folder, CVS and RCS
+# only use the folder itself
+_PARENT_MARKERS: Final[FrozenSet[str]] = _VCS_MARKERS - frozenset(('CVS', 'RCS'))
+
+
+# True if the folder entry named 'name' marks a work area
+def _is_vcs_marker(path: str, name: str) -> bool:
+    full_name = os.path.join(path, name)
+    # .git is a file for submodules
+    return os.path.isdir(full_name) or (name == '.git' and os.path.isfile(full_name))
+
+
 # utility method to help find folders used by version control systems
-def _find_parent_dir_with(path: str, dir_name: str) -> Optional[str]:
+#
+# walks up the parents of 'path' once and returns the nearest folder
+# containing each marker, keyed by the marker's name
+#
+# the result is remembered until VcsRegistry.clear() is called as every file
+# opened from the same folder repeats the same search, it must not be modified
+@functools.lru_cache(maxsize=1024)
+def _find_vcs_roots(path: str) -> Dict[str, str]:
+    roots: Dict[str, str] = {}
+    markers = _VCS_MARKERS
     while True:
-        name = os.path.join(path, dir_name)
-        if os.path.isdir(name):
-            return path
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name in markers and name not in roots:
+                        if entry.is_dir() or (name == '.git' and entry.is_file()):
+                            roots[name] = path
+        except OSError:
+            # the folder may not be readable, probe the markers individually
+            for name in markers:
+                if name not in roots and _is_vcs_marker(path, name):
+                    roots[name] = path
         newpath = os.path.dirname(path)
         if newpath == path:
             break
         path = newpath
-    return None
+        markers = _PARENT_MARKERS
+        if markers.issubset(roots):
+            break
+    return roots
 
 
-def _get_bzr_repo(path: str, prefs: Preferences) -> Optional[VcsInterface]:
-    p = _find_parent_dir_with(path, '.bzr')
-    return Bzr(p) if p else None
+def _get_bzr_repo(path: str, roots: Dict[str, str], prefs: Preferences) -> Optional[VcsInterface]:
+    p = roots.get('.bzr')
+    if p:
+        from diffuse.vcs.bzr import Bzr
+        return Bzr(p)
+    return None
 
 
-def _get_cvs_repo(path: str, prefs: Preferences) -> Optional[VcsInterface]:
-    return Cvs(path) if os.path.isdir(os.path.join(path, 'CVS')) else None
+def _get_cvs_repo(path: str, roots: Dict[str, str], prefs: Preferences) -> Optional[VcsInterface]:
+    if 'CVS' in roots:
+        from diffuse.vcs.cvs import Cvs
+        return Cvs(path)
+    return None
 
 
-def _get_darcs_repo(path: str, prefs: Preferences) -> Optional[VcsInterface]:
-    p = _find_parent_dir_with(path, '_darcs')
-    return Darcs(p) if p else None
+def _get_darcs_repo(path: str, roots: Dict[str, str], prefs: Preferences) -> Optional[VcsInterface]:
+    p = roots.get('_darcs')
+    if p:
+        from diffuse.vcs.darcs import Darcs
+        return Darcs(p)
+    return None
 
 
-def _get_git_repo(path: str, prefs: Preferences) -> Optional[VcsInterface]:
+def _get_git_repo(path: str, roots: Dict[str, str], prefs: Preferences) -> Optional[VcsInterface]:
     if 'GIT_DIR' in os.environ:
         try:
             lines: List[str] = utils.popenReadLines(
@@ -119,49 +174,78 @@ def _get_git_repo(path: str, prefs: Preferences) -> Optional[VcsInterface]:
                     path = os.curdir
                 else:
                     path = os.sep.join(dirs)
+            from diffuse.vcs.git import Git
             return Git(path)
         except (IOError, OSError):
             # working tree not found
             pass
     # search for .git directory (project) or .git file (submodule)
-    while True:
-        name = os.path.join(path, '.git')
-        if os.path.isdir(name) or os.path.isfile(name):
-            return Git(path)
-        newpath = os.path.dirname(path)
-        if newpath == path:
-            break
-        path = newpath
+    p = roots.get('.git')
+    if p:
+        from diffuse.vcs.git import Git
+        return Git(p)
     return None
 
 
-def _get_hg_repo(path: str, prefs: Preferences) -> Optional[VcsInterface]:
-    p = _find_parent_dir_with(path, '.hg')
-    return Hg(p) if p else None
+def _get_hg_repo(path: str, roots: Dict[str, str], prefs: Preferences) -> Optional[VcsInterface]:
+    p = roots.get('.hg')
+    if p:
+        from diffuse.vcs.hg import Hg
+        return Hg(p)
+    return None
 
 
-def _get_mtn_repo(path: str, prefs: Preferences) -> Optional[VcsInterface]:
-    p = _find_parent_dir_with(path, '_MTN')
-    return Mtn(p) if p else None
+def _get_mtn_repo(path: str, roots: Dict[str, str], prefs: Preferences) -> Optional[VcsInterface]:
+    p = roots.get('_MTN')
+    if p:
+        from diffuse.vcs.mtn import Mtn
+        return Mtn(p)
+    return None
 
 
-def _get_rcs_repo(path: str, prefs: Preferences) -> Optional[VcsInterface]:
-    if os.path.isdir(os.path.join(path, 'RCS')):
+def _get_rcs_repo(path: str, roots: Dict[str, str], prefs: Preferences) -> Optional[VcsInterface]:
+    if 'RCS' in roots:
+        from diffuse.vcs.rcs import Rcs
         return Rcs(path)
 
     # [rfailliot] this code doesn't seem to work, but was in 0.4.8 too.
     # I'm letting it here until further tests are done, but it is possible
     # this code never actually worked.
     try:
-        for s in os.listdir(path):
-            if s.endswith(',v') and os.path.isfile(os.path.join(path, s)):
-                return Rcs(path)
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.endswith(',v') and entry.is_file():
+                    from diffuse.vcs.rcs import Rcs
+                    return Rcs(path)
     except OSError:
         # the user specified an invalid folder name
         pass
     return None
 
 
-def _get_svn_repo(path: str, prefs: Preferences) -> Optional[VcsInterface]:
-    p = _find_parent_dir_with(path, '.svn')
-    return Svn(p) if p else None
+def _get_svn_repo(path: str, roots: Dict[str, str], prefs: Preferences) -> Optional[VcsInterface]:
+    p = roots.get('.svn')
+    if p:
+        from diffuse.vcs.svn import Svn
+        return Svn(p)
+    return None
+
+
+# the repository probe for each VCS, the module implementing each VCS is only
+# imported once a repository using it has been found
+_GET_REPO: Final[Dict[str, _RepoProbe]] = {
+    'bzr': _get_bzr_repo,
+    'cvs': _get_cvs_repo,
+    'darcs': _get_darcs_repo,
+    'git': _get_git_repo,
+    'hg': _get_hg_repo,
+    'mtn': _get_mtn_repo,
+    'rcs': _get_rcs_repo,
+    'svn': _get_svn_repo
+}
+
+
+# returns the repository probes named by the 'vcs_search_order' preference
+@functools.lru_cache(maxsize=8)
+def _get_probe_order(search_order: str) -> Tuple[_RepoProbe, ...]:
+    return tuple(_GET_REPO[vcs] for vcs in search_order.split() if vcs in _GET_REPO)
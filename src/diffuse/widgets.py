@@ -18,24 +18,34 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 import difflib
+import itertools
 import os
+import re
+import sys
 import unicodedata
 
+from bisect import bisect_left, bisect_right
 from enum import Flag, IntFlag, auto
 from gettext import gettext as _
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Dict, Final, List, Optional, Set, Tuple
 
 from diffuse import utils
 from diffuse.resources import theResources
 from diffuse.utils import LineEnding
 
+# use the C implementation of difflib's SequenceMatcher when it is installed
+try:
+    from cdifflib import CSequenceMatcher  # type: ignore
+except ImportError:
+    CSequenceMatcher = None
+
 import gi  # type: ignore
 gi.require_version('GObject', '2.0')
 gi.require_version('Gdk', '3.0')
 gi.require_version('Gtk', '3.0')
 gi.require_version('Pango', '1.0')
 gi.require_version('PangoCairo', '1.0')
-from gi.repository import GObject, Gdk, Gtk, Pango, PangoCairo  # type: ignore # noqa: E402
+from gi.repository import GLib, GObject, Gdk, Gtk, Pango, PangoCairo  # type: ignore # noqa: E402
 
 
 # the file diff viewer is always in one of these modes defining the cursor,
@@ -51,10 +61,13 @@ class EditMode(Flag):
 # the application to become unresponsive for a while as it processed a large
 # queue of keypress and expose event pairs.
 class ScrolledWindow(Gtk.Grid):
-    scroll_directions = set((Gdk.ScrollDirection.UP,
-                             Gdk.ScrollDirection.DOWN,
-                             Gdk.ScrollDirection.LEFT,
-                             Gdk.ScrollDirection.RIGHT))
+    # maps scroll directions to the step size and whether they are vertical
+    scroll_directions = {
+        Gdk.ScrollDirection.UP: (-100, True),
+        Gdk.ScrollDirection.DOWN: (100, True),
+        Gdk.ScrollDirection.LEFT: (-100, False),
+        Gdk.ScrollDirection.RIGHT: (100, False)
+    }
 
     def __init__(self, hadj, vadj):
         Gtk.Grid.__init__(self)
@@ -105,12 +118,9 @@ class ScrolledWindow(Gtk.Grid):
 
     # update the vertical adjustment when the mouse's scroll wheel is used
     def scroll_cb(self, widget, event):
-        d = event.direction
-        if d in self.scroll_directions:
-            delta = 100
-            if d in (Gdk.ScrollDirection.UP, Gdk.ScrollDirection.LEFT):
-                delta = -delta
-            vertical = (d in (Gdk.ScrollDirection.UP, Gdk.ScrollDirection.DOWN))
+        info = self.scroll_directions.get(event.direction)
+        if info is not None:
+            delta, vertical = info
             if event.state & Gdk.ModifierType.SHIFT_MASK:
                 vertical = not vertical
             if vertical:
@@ -172,6 +182,17 @@ class FileDiffViewerBase(Gtk.Grid):
 
     # class describing a single line of a pane
     class Line:
+        # a pane holds one of these for every line of a file so fixed slots keep
+        # them small and their attributes quick to reach
+        __slots__ = (
+            'line_number',
+            'text',
+            'is_modified',
+            'modified_text',
+            'compare_string',
+            'alignment_hash',
+            'alignment_epoch')
+
         def __init__(self, line_number: Optional[int] = None, text: Optional[str] = None) -> None:
             # line number
             self.line_number = line_number
@@ -184,6 +205,10 @@ class FileDiffViewerBase(Gtk.Grid):
             # cache used to speed up comparison of strings
             # this should be cleared whenever the comparison preferences change
             self.compare_string: Optional[str] = None
+            # cache used to speed up alignment, only valid while
+            # alignment_epoch matches the viewer's alignment epoch
+            self.alignment_hash: Optional[str] = None
+            self.alignment_epoch = -1
 
         # returns the current text for this line
         def getText(self) -> Optional[str]:
@@ -191,6 +216,95 @@ class FileDiffViewerBase(Gtk.Grid):
                 return self.modified_text
             return self.text
 
+    # keybindings and buttons mapped to the names of the methods implementing
+    # them, the methods are looked up when the action is run so viewers do not
+    # each hold bound methods for every action
+    _line_mode_actions: Dict[str, str] = {
+        'enter-align-mode': '_line_mode_enter_align_mode',
+        'enter-character-mode': 'setCharMode',
+        'first-line': '_first_line',
+        'extend-first-line': '_extend_first_line',
+        'last-line': '_last_line',
+        'extend-last-line': '_extend_last_line',
+        'up': '_line_mode_up',
+        'extend-up': '_line_mode_extend_up',
+        'down': '_line_mode_down',
+        'extend-down': '_line_mode_extend_down',
+        'left': '_line_mode_left',
+        'extend-left': '_line_mode_extend_left',
+        'right': '_line_mode_right',
+        'extend-right': '_line_mode_extend_right',
+        'page-up': '_line_mode_page_up',
+        'extend-page-up': '_line_mode_extend_page_up',
+        'page-down': '_line_mode_page_down',
+        'extend-page-down': '_line_mode_extend_page_down',
+        'delete-text': '_delete_text',
+        'clear-edits': 'clear_edits',
+        'isolate': 'isolate',
+        'first-difference': 'first_difference',
+        'previous-difference': 'previous_difference',
+        'next-difference': 'next_difference',
+        'last-difference': 'last_difference',
+        'copy-selection-right': 'copy_selection_right',
+        'copy-selection-left': 'copy_selection_left',
+        'copy-left-into-selection': 'copy_left_into_selection',
+        'copy-right-into-selection': 'copy_right_into_selection',
+        'merge-from-left-then-right': 'merge_from_left_then_right',
+        'merge-from-right-then-left': 'merge_from_right_then_left'
+    }
+    _align_mode_actions: Dict[str, str] = {
+        'enter-line-mode': '_align_mode_enter_line_mode',
+        'enter-character-mode': 'setCharMode',
+        'first-line': '_first_line',
+        'last-line': '_last_line',
+        'up': '_line_mode_up',
+        'down': '_line_mode_down',
+        'left': '_line_mode_left',
+        'right': '_line_mode_right',
+        'page-up': '_line_mode_page_up',
+        'page-down': '_line_mode_page_down',
+        'align': '_align_text'
+    }
+    _character_mode_actions: Dict[str, str] = {
+        'enter-line-mode': 'setLineMode'
+    }
+    _button_actions: Dict[str, str] = {
+        'undo': 'undo',
+        'redo': 'redo',
+        'cut': 'cut',
+        'copy': 'copy',
+        'paste': 'paste',
+        'select-all': 'select_all',
+        'clear-edits': 'clear_edits',
+        'dismiss-all-edits': 'dismiss_all_edits',
+        'realign-all': 'realign_all',
+        'isolate': 'isolate',
+        'first-difference': 'first_difference',
+        'previous-difference': 'previous_difference',
+        'next-difference': 'next_difference',
+        'last-difference': 'last_difference',
+        'shift-pane-right': 'shift_pane_right',
+        'shift-pane-left': 'shift_pane_left',
+        'convert-to-upper-case': 'convert_to_upper_case',
+        'convert-to-lower-case': 'convert_to_lower_case',
+        'sort-lines-in-ascending-order': 'sort_lines_in_ascending_order',
+        'sort-lines-in-descending-order': 'sort_lines_in_descending_order',
+        'remove-trailing-white-space': 'remove_trailing_white_space',
+        'convert-tabs-to-spaces': 'convert_tabs_to_spaces',
+        'convert-leading-spaces-to-tabs': 'convert_leading_spaces_to_tabs',
+        'increase-indenting': 'increase_indenting',
+        'decrease-indenting': 'decrease_indenting',
+        'convert-to-dos': 'convert_to_dos',
+        'convert-to-mac': 'convert_to_mac',
+        'convert-to-unix': 'convert_to_unix',
+        'copy-selection-right': 'copy_selection_right',
+        'copy-selection-left': 'copy_selection_left',
+        'copy-left-into-selection': 'copy_left_into_selection',
+        'copy-right-into-selection': 'copy_right_into_selection',
+        'merge-from-left-then-right': 'merge_from_left_then_right',
+        'merge-from-right-then-left': 'merge_from_right_then_left'
+    }
+
     def __init__(self, n, prefs):
         # verify we have a valid number of panes
         if n < 2:
@@ -198,17 +312,24 @@ class FileDiffViewerBase(Gtk.Grid):
 
         super().__init__()
 
-        # mapping to column width of a character (tab will never be in this map)
-        self._char_width_cache: Dict[str, int] = {}
+        # mapping to column width of a character (tab will never be in this map),
+        # the ASCII characters are filled in up front
+        self._char_width_cache: Dict[str, int] = dict(_ASCII_CHARACTER_WIDTHS)
 
         self.set_can_focus(True)
         self.prefs = prefs
-        self.string_width_cache: Dict[str, Optional[int]] = {}
+        self._readDisplayPrefs()
+        self._alignment_prefs: Tuple[bool, ...] = ()
+        self._alignment_epoch = 0
+        self._readAlignmentPrefs()
         self.options = {}
 
         # diff blocks
         self.blocks = []
 
+        # number of lines with edits in all panes
+        self._total_edits = 0
+
         # undos
         self.undos = []
         self.redos = []
@@ -218,6 +339,12 @@ class FileDiffViewerBase(Gtk.Grid):
         self.syntax = ''
         self.diffmap_cache = None
 
+        # redraws requested since the last time they were passed on to GTK
+        self._redraw_panes: Set[int] = set()
+        self._redraw_lines: Dict[int, List[Tuple[int, int]]] = {}
+        self._redraw_diffmap = False
+        self._redraw_scheduled = False
+
         # editing mode
         self.mode = EditMode.LINE
         self.current_pane = 1
@@ -229,93 +356,6 @@ class FileDiffViewerBase(Gtk.Grid):
         self.align_line = 0
         self.cursor_column = -1
 
-        # keybindings
-        self._line_mode_actions: Dict[str, Callable] = {
-            'enter-align-mode': self._line_mode_enter_align_mode,
-            'enter-character-mode': self.setCharMode,
-            'first-line': self._first_line,
-            'extend-first-line': self._extend_first_line,
-            'last-line': self._last_line,
-            'extend-last-line': self._extend_last_line,
-            'up': self._line_mode_up,
-            'extend-up': self._line_mode_extend_up,
-            'down': self._line_mode_down,
-            'extend-down': self._line_mode_extend_down,
-            'left': self._line_mode_left,
-            'extend-left': self._line_mode_extend_left,
-            'right': self._line_mode_right,
-            'extend-right': self._line_mode_extend_right,
-            'page-up': self._line_mode_page_up,
-            'extend-page-up': self._line_mode_extend_page_up,
-            'page-down': self._line_mode_page_down,
-            'extend-page-down': self._line_mode_extend_page_down,
-            'delete-text': self._delete_text,
-            'clear-edits': self.clear_edits,
-            'isolate': self.isolate,
-            'first-difference': self.first_difference,
-            'previous-difference': self.previous_difference,
-            'next-difference': self.next_difference,
-            'last-difference': self.last_difference,
-            'copy-selection-right': self.copy_selection_right,
-            'copy-selection-left': self.copy_selection_left,
-            'copy-left-into-selection': self.copy_left_into_selection,
-            'copy-right-into-selection': self.copy_right_into_selection,
-            'merge-from-left-then-right': self.merge_from_left_then_right,
-            'merge-from-right-then-left': self.merge_from_right_then_left
-        }
-        self._align_mode_actions: Dict[str, Callable] = {
-            'enter-line-mode': self._align_mode_enter_line_mode,
-            'enter-character-mode': self.setCharMode,
-            'first-line': self._first_line,
-            'last-line': self._last_line,
-            'up': self._line_mode_up,
-            'down': self._line_mode_down,
-            'left': self._line_mode_left,
-            'right': self._line_mode_right,
-            'page-up': self._line_mode_page_up,
-            'page-down': self._line_mode_page_down,
-            'align': self._align_text
-        }
-        self._character_mode_actions: Dict[str, Callable] = {
-            'enter-line-mode': self.setLineMode
-        }
-        self._button_actions: Dict[str, Callable] = {
-            'undo': self.undo,
-            'redo': self.redo,
-            'cut': self.cut,
-            'copy': self.copy,
-            'paste': self.paste,
-            'select-all': self.select_all,
-            'clear-edits': self.clear_edits,
-            'dismiss-all-edits': self.dismiss_all_edits,
-            'realign-all': self.realign_all,
-            'isolate': self.isolate,
-            'first-difference': self.first_difference,
-            'previous-difference': self.previous_difference,
-            'next-difference': self.next_difference,
-            'last-difference': self.last_difference,
-            'shift-pane-right': self.shift_pane_right,
-            'shift-pane-left': self.shift_pane_left,
-            'convert-to-upper-case': self.convert_to_upper_case,
-            'convert-to-lower-case': self.convert_to_lower_case,
-            'sort-lines-in-ascending-order': self.sort_lines_in_ascending_order,
-            'sort-lines-in-descending-order': self.sort_lines_in_descending_order,
-            'remove-trailing-white-space': self.remove_trailing_white_space,
-            'convert-tabs-to-spaces': self.convert_tabs_to_spaces,
-            'convert-leading-spaces-to-tabs': self.convert_leading_spaces_to_tabs,
-            'increase-indenting': self.increase_indenting,
-            'decrease-indenting': self.decrease_indenting,
-            'convert-to-dos': self.convert_to_dos,
-            'convert-to-mac': self.convert_to_mac,
-            'convert-to-unix': self.convert_to_unix,
-            'copy-selection-right': self.copy_selection_right,
-            'copy-selection-left': self.copy_selection_left,
-            'copy-left-into-selection': self.copy_left_into_selection,
-            'copy-right-into-selection': self.copy_right_into_selection,
-            'merge-from-left-then-right': self.merge_from_left_then_right,
-            'merge-from-right-then-left': self.merge_from_right_then_left
-        }
-
         # create panes
         self.dareas: List[Gtk.DrawingArea] = []
         self.panes: List[FileDiffViewerBase.Pane] = []
@@ -403,7 +443,7 @@ class FileDiffViewerBase(Gtk.Grid):
     # callback for most menu items and buttons
     def button_cb(self, widget: Gtk.Widget, data: str) -> None:
         self.openUndoBlock()
-        self._button_actions[data]()
+        getattr(self, self._button_actions[data])()
         self.closeUndoBlock()
 
     # set startup options
@@ -416,49 +456,99 @@ class FileDiffViewerBase(Gtk.Grid):
         metrics = self.get_pango_context().get_metrics(self.font)
         self.font_height = max(_pixels(metrics.get_ascent() + metrics.get_descent()), 1)
         self.digit_width = metrics.get_approximate_digit_width()
+        # layout reused by getTextWidth() to measure text in this font
+        self._measure_layout = self.create_pango_layout('')
+        self._measure_layout.set_font_description(font)
+        # the cached layouts were made with the old font
+        for pane in self.panes:
+            del pane.syntax_cache[:]
+            del pane.diff_cache[:]
         self.updateSize(True)
         self.diffmap.queue_draw()
 
+    # remembers the preferences used when measuring every character so they
+    # are not looked up again in the drawing and measuring loops
+    def _readDisplayPrefs(self) -> None:
+        self._tab_width = self.prefs.getInt('display_tab_width')
+        self._show_whitespace = self.prefs.getBool('display_show_whitespace')
+
+    # remembers the alignment preferences so hashing a line does not look them
+    # up, and starts a new alignment epoch, invalidating the alignment hashes
+    # cached on lines, if they have changed
+    def _readAlignmentPrefs(self) -> None:
+        prefs = tuple(self.prefs.getBool(name) for name in _ALIGNMENT_PREFS)
+        if prefs != self._alignment_prefs:
+            self._alignment_prefs = prefs
+            self._alignment_epoch += 1
+
     # returns the 'column width' for a string -- used to help position
     # characters when tabs and other special characters are present
     # This is an inline loop over self.characterWidth() for performance reasons.
     def stringWidth(self, s: str) -> int:
-        if not self.prefs.getBool('display_show_whitespace'):
+        visible = self._show_whitespace
+        tab_width = self._tab_width
+        # the width only depends on the text and these preferences so the
+        # results are shared by all viewers
+        key = (tab_width, visible, s)
+        try:
+            return _string_width_cache[key]
+        except KeyError:
+            pass
+        if not visible:
             s = utils.strip_eol(s)
-        col = 0
-        for c in s:
-            try:
-                w = self._char_width_cache[c]
-            except KeyError:
-                v = ord(c)
-                if v < 32:
-                    if c == '\t':
-                        tab_width = self.prefs.getInt('display_tab_width')
-                        w = tab_width - col % tab_width
-                    elif c == '\n':
-                        w = 1
-                        self._char_width_cache[c] = w
+        if s.isascii() and s.isprintable():
+            # printable ASCII characters are all one column wide
+            col = len(s)
+        elif s.isascii() and s.replace('\t', ' ').isprintable():
+            # only the tabs need to be expanded
+            parts = s.split('\t')
+            col = 0
+            for part in parts[:-1]:
+                col += len(part)
+                col += tab_width - col % tab_width
+            col += len(parts[-1])
+        elif '\t' not in s and self._char_width_cache.keys() >= set(s):
+            # the widths of all of the characters are known so let the
+            # built-ins add them up without a Python loop
+            col = sum(map(self._char_width_cache.__getitem__, s))
+        else:
+            col = 0
+            # tabs are never cached so look up with get() rather than paying
+            # for a KeyError every time
+            get_width = self._char_width_cache.get
+            for c in s:
+                w = get_width(c)
+                if w is None:
+                    v = ord(c)
+                    if v < 32:
+                        if c == '\t':
+                            w = tab_width - col % tab_width
+                        elif c == '\n':
+                            w = 1
+                            self._char_width_cache[c] = w
+                        else:
+                            w = 2
+                            self._char_width_cache[c] = w
                     else:
-                        w = 2
+                        if unicodedata.east_asian_width(c) in 'WF':
+                            w = 2
+                        else:
+                            w = 1
                         self._char_width_cache[c] = w
-                else:
-                    if unicodedata.east_asian_width(c) in 'WF':
-                        w = 2
-                    else:
-                        w = 1
-                    self._char_width_cache[c] = w
-            col += w
+                col += w
+        if len(_string_width_cache) >= _STRING_WIDTH_CACHE_SIZE:
+            _trim_string_width_cache()
+        _string_width_cache[key] = col
         return col
 
     # returns the 'column width' for a single character created at column 'i'
     def characterWidth(self, i: int, c: str) -> int:
-        try:
-            return self._char_width_cache[c]
-        except KeyError:
+        w = self._char_width_cache.get(c)
+        if w is None:
             v = ord(c)
             if v < 32:
                 if c == '\t':
-                    tab_width = self.prefs.getInt('display_tab_width')
+                    tab_width = self._tab_width
                     return tab_width - i % tab_width
                 if c == '\n':
                     w = 1
@@ -469,15 +559,21 @@ class FileDiffViewerBase(Gtk.Grid):
             else:
                 w = 1
             self._char_width_cache[c] = w
-            return w
+        return w
 
     # translates a string into an array of the printable representation for
     # each character
     def expand(self, s: str) -> List[str]:
-        visible = self.prefs.getBool('display_show_whitespace')
+        visible = self._show_whitespace
         if not visible:
             s = utils.strip_eol(s)
-        tab_width = self.prefs.getInt('display_tab_width')
+        if s.isprintable() or (visible and s.endswith('\n') and s[:-1].isprintable()):
+            # without tabs or control characters each character is shown as
+            # itself except for the visible white space
+            if visible:
+                s = s.translate(_VISIBLE_WHITESPACE_TABLE)
+            return list(s)
+        tab_width = self._tab_width
         col = 0
         result: List[str] = []
         for c in s:
@@ -548,13 +644,11 @@ class FileDiffViewerBase(Gtk.Grid):
     def setSyntax(self, new_syntax: str) -> None:
         if self.syntax is not new_syntax:
             self.syntax = new_syntax
-            # invalidate the syntax caches
-            for pane in self.panes:
-                pane.syntax_cache = []
+            # invalidate the syntax caches and force all panes to redraw
+            for f, pane in enumerate(self.panes):
+                del pane.syntax_cache[:]
+                self._queueRedraw(f)
             self.emit('syntax-changed', new_syntax)
-            # force all panes to redraw
-            for darea in self.dareas:
-                darea.queue_draw()
 
     # gets the syntax
     def getSyntax(self):
@@ -562,10 +656,7 @@ class FileDiffViewerBase(Gtk.Grid):
 
     # returns True if any pane contains edits
     def hasEdits(self) -> bool:
-        for pane in self.panes:
-            if pane.num_edits > 0:
-                return True
-        return False
+        return self._total_edits > 0
 
     # Changes to the diff viewer's state is recorded so they can be later
     # undone.  The recorded changes are organised into blocks that correspond
@@ -594,6 +685,49 @@ class FileDiffViewerBase(Gtk.Grid):
             self.redos = []
             self.undos.append(self.undoblock)
         self.undoblock = None
+        self._flushRedraws()
+
+    # queues a full redraw of pane 'f' and, if requested, the overview map
+    # edits touching many lines request the same redraws repeatedly so they
+    # are collected and passed on to GTK once
+    def _queueRedraw(self, f: Optional[int], diffmap: bool = False) -> None:
+        if f is not None:
+            self._redraw_panes.add(f)
+        if diffmap:
+            self._redraw_diffmap = True
+        if not self._redraw_scheduled:
+            self._redraw_scheduled = True
+            # run ahead of GTK's redraw so no frame is missed
+            GLib.idle_add(self._flushRedraws, priority=GLib.PRIORITY_HIGH_IDLE)
+
+    # passes the collected redraw requests on to GTK
+    def _flushRedraws(self) -> bool:
+        self._redraw_scheduled = False
+        for f in self._redraw_panes:
+            if f < len(self.dareas):
+                self.dareas[f].queue_draw()
+        # merge the overlapping and adjacent ranges of lines for each pane not
+        # already being redrawn in full
+        h, y = self.font_height, int(self.vadj.get_value())
+        for f, ranges in self._redraw_lines.items():
+            if f in self._redraw_panes or f >= len(self.dareas):
+                continue
+            darea = self.dareas[f]
+            w = darea.get_allocation().width
+            ranges.sort()
+            line0, line1 = ranges[0]
+            for start, end in ranges[1:]:
+                if start > line1 + 1:
+                    darea.queue_draw_area(0, line0 * h - y, w, (line1 - line0 + 1) * h)
+                    line0 = start
+                line1 = max(line1, end)
+            darea.queue_draw_area(0, line0 * h - y, w, (line1 - line0 + 1) * h)
+        self._redraw_panes.clear()
+        self._redraw_lines.clear()
+        if self._redraw_diffmap:
+            self._redraw_diffmap = False
+            self.diffmap.queue_draw()
+        return False
 
     # 'undo' action
     def undo(self) -> None:
@@ -607,7 +741,7 @@ class FileDiffViewerBase(Gtk.Grid):
                 block = self.undos.pop()
                 self.redos.append(block)
                 # undo all changes in the block in reverse order
-                for u in block[::-1]:
+                for u in reversed(block):
                     u.undo(self)
         self.undoblock = old_block
 
@@ -642,8 +776,8 @@ class FileDiffViewerBase(Gtk.Grid):
     def getTextWidth(self, text: str) -> int:
         if len(text) == 0:
             return 0
-        layout = self.create_pango_layout(text)
-        layout.set_font_description(self.font)
+        layout = self._measure_layout
+        layout.set_text(text, -1)
         return layout.get_size()[0]
 
     # updates the size of the viewport
@@ -652,29 +786,23 @@ class FileDiffViewerBase(Gtk.Grid):
     # this value otherwise
     def updateSize(self, compute_width: bool, f: Optional[int] = None) -> None:
         digit_width, stringWidth = self.digit_width, self.stringWidth
-        string_width_cache = self.string_width_cache
         if compute_width:
             if f is None:
                 panes = self.panes
             else:
                 panes = [self.panes[f]]
             for pane in panes:
-                del pane.syntax_cache[:]
-                del pane.diff_cache[:]
-                # re-compute the high water mark
-                pane.line_lengths = 0
+                # re-compute the high water mark from the widest line
+                widths = [0]
+                append = widths.append
                 for line in pane.lines:
                     if line is not None:
                         line.compare_string = None
-                        text = [line.text]
-                        if line.is_modified:
-                            text.append(line.modified_text)
-                        for s in text:
-                            if s is not None:
-                                swc = string_width_cache.get(s, None)
-                                if swc is None:
-                                    string_width_cache[s] = swc = stringWidth(s)
-                                pane.line_lengths = max(pane.line_lengths, digit_width * swc)
+                        if line.text is not None:
+                            append(stringWidth(line.text))
+                        if line.is_modified and line.modified_text is not None:
+                            append(stringWidth(line.modified_text))
+                pane.line_lengths = digit_width * max(widths)
         # compute the maximum extents
         num_lines, line_lengths = 0, 0
         for pane in self.panes:
@@ -800,28 +928,40 @@ class FileDiffViewerBase(Gtk.Grid):
                 line.modified_text,
                 is_modified,
                 text))
+        # getMapFlags() has just cached the line's compare string
+        old_compare, was_modified = line.compare_string, line.is_modified
         old_num_edits = pane.num_edits
         if is_modified and not line.is_modified:
             pane.num_edits += 1
         elif not is_modified and line.is_modified:
             pane.num_edits -= 1
         if pane.num_edits != old_num_edits:
+            self._total_edits += pane.num_edits - old_num_edits
             self.emit('num-edits-changed', f)
         line.is_modified = is_modified
         line.modified_text = text
         line.compare_string = None
+        line.alignment_hash = None
 
         # update/invalidate all relevant caches and queue widgets for redraw
         if text is not None:
             pane.line_lengths = max(pane.line_lengths, self.digit_width * self.stringWidth(text))
         self.updateSize(False)
 
+        # when the line still compares the same, its map flags are unchanged
+        # and neighbours matching it have no character differences to redo
+        unchanged = (
+            old_compare is not None and
+            was_modified == is_modified and
+            self.getCompareString(f, i) == old_compare)
         fs = []
         if f > 0:
             fs.append(f - 1)
         if f + 1 < len(self.panes):
             fs.append(f + 1)
         for fn in fs:
+            if unchanged and self.getCompareString(fn, i) == old_compare:
+                continue
             otherpane = self.panes[fn]
             if i < len(otherpane.diff_cache):
                 otherpane.diff_cache[i] = None
@@ -830,10 +970,10 @@ class FileDiffViewerBase(Gtk.Grid):
             del pane.syntax_cache[i:]
         if i < len(pane.diff_cache):
             pane.diff_cache[i] = None
-        self.dareas[f].queue_draw()
-        if self.getMapFlags(f, i) != flags:
+        diffmap = not unchanged and self.getMapFlags(f, i) != flags
+        if diffmap:
             self.diffmap_cache = None
-            self.diffmap.queue_draw()
+        self._queueRedraw(f, diffmap)
 
     # Undo for inserting a spacing line in a single pane
     class InsertNullUndo:
@@ -868,6 +1008,50 @@ class FileDiffViewerBase(Gtk.Grid):
                 state = pane.syntax_cache[i][0]
                 pane.syntax_cache.insert(i, [state, state, None, None])
 
+    # Undo for inserting spacing lines at several rows of a single pane
+    class InsertNullsUndo:
+        def __init__(self, f: int, rows: List[int], reverse: bool) -> None:
+            self.data = (f, rows, reverse)
+
+        def undo(self, viewer):
+            f, rows, reverse = self.data
+            viewer.insertNulls(f, rows, not reverse)
+
+        def redo(self, viewer):
+            f, rows, reverse = self.data
+            viewer.insertNulls(f, rows, reverse)
+
+    # insert spacing lines (or remove them if 'reverse' is True) in pane 'f'
+    # at the ascending rows 'rows', the rows are counted with the spacing lines
+    # present, this gives the same result as calling insertNull() for each row
+    # but rebuilds the pane's lists once
+    def insertNulls(self, f: int, rows: List[int], reverse: bool) -> None:
+        if len(rows) == 0:
+            return
+        if self.undoblock is not None:
+            # create an Undo object for the action
+            self.addUndo(FileDiffViewerBase.InsertNullsUndo(f, rows, reverse))
+        pane = self.panes[f]
+        lines, syntax_cache = pane.lines, pane.syntax_cache
+        selected = set(rows)
+        # update/invalidate all relevant caches
+        if reverse:
+            lines[:] = [line for i, line in enumerate(lines) if i not in selected]
+            syntax_cache[:] = [c for i, c in enumerate(syntax_cache) if i not in selected]
+        else:
+            it = iter(lines)
+            lines[:] = [
+                None if i in selected else next(it) for i in range(len(lines) + len(rows))]
+            # spacing lines take the state of the line following them and are
+            # only cached ahead of a cached line
+            cache: List[List[Any]] = []
+            for c in syntax_cache:
+                while len(cache) in selected:
+                    state = c[0]
+                    cache.append([state, state, None, None])
+                cache.append(c)
+            syntax_cache[:] = cache
+
     # Undo for manipulating a section of the line matching data
     class InvalidateLineMatchingUndo:
         def __init__(self, i, n, new_n):
@@ -888,15 +1072,17 @@ class FileDiffViewerBase(Gtk.Grid):
             self.addUndo(FileDiffViewerBase.InvalidateLineMatchingUndo(i, n, new_n))
         # update/invalidate all relevant caches and queue widgets for redraw
         i2 = i + n
+        # the same run of empty entries is copied into each pane's cache
+        invalid = new_n * [None]
         for f, pane in enumerate(self.panes):
             if i < len(pane.diff_cache):
                 if i2 + 1 < len(pane.diff_cache):
-                    pane.diff_cache[i:i2] = new_n * [None]
+                    pane.diff_cache[i:i2] = invalid
                 else:
                     del pane.diff_cache[i:]
-            self.dareas[f].queue_draw()
+            self._queueRedraw(f)
         self.diffmap_cache = None
-        self.diffmap.queue_draw()
+        self._queueRedraw(None, True)
 
     # Undo for alignment changes
     class AlignmentChangeUndo:
@@ -978,7 +1164,7 @@ class FileDiffViewerBase(Gtk.Grid):
         # queue redraws
         self.updateSize(False)
         self.diffmap_cache = None
-        self.diffmap.queue_draw()
+        self._queueRedraw(None, True)
 
     # remove a line
     def removeSpacerLines(self, i: int, n: int, skip: int = -1) -> int:
@@ -1003,18 +1189,17 @@ class FileDiffViewerBase(Gtk.Grid):
 
         nremoved = len(removed)
         if nremoved > 0:
-            # update blocks
-            bi, bii, blocks = 0, 0, self.blocks[:]
+            # update blocks, locating the block for each removed line with a
+            # binary search over the original block end offsets
+            bi, blocks = 0, self.blocks[:]
+            offsets = list(itertools.accumulate(blocks))
             for j in removed:
-                while bii + blocks[bi] < j:
-                    bii += blocks[bi]
+                bi = bisect_left(offsets, j, bi)
+                blocks[bi] -= 1
+                if blocks[bi] == 0:
                     bi += 1
-                if blocks[bi] == 1:
-                    del blocks[bi]
-                else:
-                    blocks[bi] -= 1
-                bii += 1
-            self.updateBlocks(blocks)
+            # drop the blocks that were emptied
+            self.updateBlocks([n for n, m in zip(blocks, self.blocks) if n != 0 or m == 0])
 
             self.alignmentChange(False)
             removed.reverse()
@@ -1030,7 +1215,7 @@ class FileDiffViewerBase(Gtk.Grid):
             # queue redraws
             self.updateSize(False)
             self.diffmap_cache = None
-            self.diffmap.queue_draw()
+            self._queueRedraw(None, True)
         return nremoved
 
     # Undo for replacing the lines for a single pane with a new set
@@ -1053,58 +1238,68 @@ class FileDiffViewerBase(Gtk.Grid):
             self.addUndo(FileDiffViewerBase.ReplaceLinesUndo(
                 f, lines, new_lines, max_num, new_max_num))
         pane = self.panes[f]
-        pane.lines = new_lines
+        old_lines, pane.lines = pane.lines, new_lines
         # update/invalidate all relevant caches and queue widgets for redraw
         old_num_edits = pane.num_edits
-        pane.num_edits = 0
-        for line in new_lines:
-            if line is not None and line.is_modified:
-                pane.num_edits += 1
+        pane.num_edits = sum(1 for line in new_lines if line is not None and line.is_modified)
         if pane.num_edits != old_num_edits:
+            self._total_edits += pane.num_edits - old_num_edits
             self.emit('num-edits-changed', f)
-        del pane.syntax_cache[:]
+        # syntax highlighting for a line only depends on its text and the text
+        # before it so the cache is kept for the unchanged lines at the start
+        syntax_cache = pane.syntax_cache
+        i, n = 0, min(len(syntax_cache), len(new_lines), len(old_lines))
+        while i < n and _same_text(old_lines[i], new_lines[i]):
+            i += 1
+        del syntax_cache[i:]
+        del pane.diff_cache[:]
         pane.max_line_number = new_max_num
-        self.dareas[f].queue_draw()
         self.updateSize(True, f)
         self.diffmap_cache = None
-        self.diffmap.queue_draw()
+        self._queueRedraw(f, True)
 
-    # create a hash for a line to use for line matching
+    # returns the hash for a line to use for line matching, reusing the one
+    # cached on the line when it is still valid
     def _alignmentHash(self, line: Line) -> Optional[str]:
+        h = line.alignment_hash
+        if h is None or line.alignment_epoch != self._alignment_epoch:
+            h = self._computeAlignmentHash(line)
+            line.alignment_hash, line.alignment_epoch = h, self._alignment_epoch
+        return h
+
+    # create a hash for a line to use for line matching
+    def _computeAlignmentHash(self, line: Line) -> Optional[str]:
         text = line.getText()
         if text is None:
             return None
-        pref = self.prefs.getBool
-        if pref('align_ignore_whitespace'):
+        (
+            ignore_whitespace,
+            ignore_endofline,
+            ignore_blanklines,
+            ignore_whitespace_changes,
+            ignore_case
+        ) = self._alignment_prefs
+        if ignore_whitespace:
             # strip all white space from the string
-            for c in utils.whitespace:
-                text = text.replace(c, '')
+            text = text.translate(_WHITESPACE_DELETE_TABLE)
         else:
             # hashes for non-null lines should start with '+' to distinguish
             # them from blank lines
-            if pref('align_ignore_endofline'):
+            if ignore_endofline:
                 text = utils.strip_eol(text)
-            if pref('align_ignore_blanklines') and _is_blank(text):
+            if ignore_blanklines and _is_blank(text):
                 # consider all lines containing only white space as the same
                 return ''
 
-            if pref('align_ignore_whitespace_changes'):
+            if ignore_whitespace_changes:
                 # replace all blocks of white space with a single space
-                pc = True
-                r: List[str] = []
-                for c in text:
-                    if c in utils.whitespace:
-                        if pc:
-                            r.append(' ')
-                            pc = False
-                    else:
-                        r.append(c)
-                        pc = True
-                text = ''.join(r)
-        if pref('align_ignore_case'):
+                text = _WHITESPACE_PATTERN.sub(' ', text)
+        if ignore_case:
             # convert everything to upper case
             text = text.upper()
-        return text
+        # interning makes equal hashes the same object so comparing them while
+        # aligning is an identity check
+        return sys.intern(text)
 
     # align sets of lines by inserting null spacers and updating the size
     # of blocks to which they belong
@@ -1124,8 +1319,12 @@ class FileDiffViewerBase(Gtk.Grid):
         s1, s2 = mlines
         n1, n2 = 0, 0
         # hash lines according to the alignment preferences
-        t1 = [self._alignmentHash(s) for s in s1]
-        t2 = [self._alignmentHash(s) for s in s2]
+        alignment_hash = self._alignmentHash
+        t1 = [alignment_hash(s) for s in s1]
+        t2 = [alignment_hash(s) for s in s2]
+        if t1 == t2 and len(s1) == len(middle[0]) and len(s2) == len(middle[1]):
+            # the sides already match line for line without any spacers
+            return
         # align s1 and s2 by inserting spacer lines
         # this will be used to determine which lines from the inner lists of
         # lines should be neighbours
@@ -1147,16 +1346,21 @@ class FileDiffViewerBase(Gtk.Grid):
         # size of blocks in leftblocks and rightblocks as spacer lines are
         # inserted
         #
-        # advance one row at a time inserting spacer lines as we go
+        # advance one row at a time deciding where spacer lines go, the rows
+        # for each side are recorded as indices into the existing lists of
+        # lines (or None for a spacer) so the lists can be rebuilt in one pass
         # 'i' indicates which row we are processing
         # 'k' indicates which pair of neighbors we are processing
+        # 'r' indicates the next existing line for each side
         i, k = 0, 0
+        r = [0, 0]
+        rows: Tuple[List[Optional[int]], List[Optional[int]]] = ([], [])
         bi = [0, 0]
         bn = [0, 0]
         while True:
             # if we have reached the end of the list for any side, it needs
             # spacer lines to align with the other side
-            insert = [i >= len(m) for m in middle]
+            insert = [r[j] >= len(middle[j]) for j in range(2)]
             if insert == [True, True]:
                 # we have reached the end of both inner lists of lines
                 # we are done
@@ -1167,7 +1371,7 @@ class FileDiffViewerBase(Gtk.Grid):
                 accept = True
                 for j in range(2):
                     m = mlines[j][k]
-                    if middle[j][i] is not m:
+                    if middle[j][r[j]] is not m:
                         # this line does not correspond to the pair of
                         # neighbours we expected
                         if m is None:
@@ -1183,26 +1387,35 @@ class FileDiffViewerBase(Gtk.Grid):
                     k += 1
                 else:
                     # insert spacer lines as needed
-                    insert = [m[i] is not None for m in middle]
+                    insert = [middle[j][r[j]] is not None for j in range(2)]
             for j in range(2):
-                if insert[j]:
+                if not insert[j]:
+                    # keep the next existing line for side 'j'
+                    rows[j].append(r[j])
+                    r[j] += 1
+                else:
                     # insert spacers lines for side 'j'
-                    for temp in lines[j]:
-                        temp.insert(i, None)
+                    rows[j].append(None)
                     blocksj = blocks[j]
                     bij = bi[j]
                     bnj = bn[j]
                     # append a new block if needed
                     if len(blocksj) == 0:
                         blocksj.append(0)
-                    # advance to the current block
+                    # advance to the current block, rows only move forward so
+                    # the search resumes from where the last spacer left it
                     while bnj + blocksj[bij] < i:
                         bnj += blocksj[bij]
                         bij += 1
+                    bi[j], bn[j] = bij, bnj
                     # increase the current block size
                     blocksj[bij] += 1
             # advance to the next row
             i += 1
+        # rebuild the lists of lines for each side with the spacers in place
+        for j in range(2):
+            for temp in lines[j]:
+                temp[:] = [None if x is None else temp[x] for x in rows[j]]
 
     # replace the contents of pane 'f' with the strings list of strings 'ss'
     def replaceContents(self, f, ss):
@@ -1223,8 +1436,8 @@ class FileDiffViewerBase(Gtk.Grid):
             # align with panes to the left
             # use copies so the originals can be used by the Undo object
             leftblocks = self.blocks[:]
-            leftlines = [pane.lines[:] for pane in self.panes[:f]]
-            _remove_null_lines(leftblocks, leftlines)
+            leftlines = _copy_without_null_lines(
+                leftblocks, [pane.lines for pane in self.panes[:f]])
             self.alignBlocks(leftblocks, leftlines, blocks, mid)
             mid[:0] = leftlines
             blocks = _merge_blocks(leftblocks, blocks)
@@ -1232,8 +1445,8 @@ class FileDiffViewerBase(Gtk.Grid):
             # align with panes to the right
             # use copies so the originals can be used by the Undo object
             rightblocks = self.blocks[:]
-            rightlines = [pane.lines[:] for pane in self.panes[f + 1:]]
-            _remove_null_lines(rightblocks, rightlines)
+            rightlines = _copy_without_null_lines(
+                rightblocks, [pane.lines for pane in self.panes[f + 1:]])
             self.alignBlocks(blocks, mid, rightblocks, rightlines)
             mid.extend(rightlines)
             blocks = _merge_blocks(blocks, rightblocks)
@@ -1245,16 +1458,14 @@ class FileDiffViewerBase(Gtk.Grid):
         self.replaceLines(f, pane.lines, mid[f], pane.max_line_number, n)
 
         # insert or remove spacer lines from the other panes
-        insertNull, getLine = self.insertNull, self.getLine
         for f_idx in range(len(self.panes)):
             if f_idx != f:
-                for j in range(old_n-1, -1, -1):
-                    if getLine(f_idx, j) is None:
-                        insertNull(f_idx, j, True)
+                lines = self.panes[f_idx].lines
+                self.insertNulls(
+                    f_idx, [j for j in range(old_n) if lines[j] is None], True)
                 temp = mid[f_idx]
-                for j in range(new_n):
-                    if temp[j] is None:
-                        insertNull(f_idx, j, False)
+                self.insertNulls(
+                    f_idx, [j for j in range(new_n) if temp[j] is None], False)
 
         # update the blocks
         self.invalidateLineMatching(0, old_n, new_n)
@@ -1547,14 +1758,14 @@ class FileDiffViewerBase(Gtk.Grid):
         self.dareas[old_f].queue_draw()
 
     # queue a range of lines for redrawing
+    # the ranges are collected and passed on to GTK with the other redraws
     def _queue_draw_lines(self, f: int, line0: int, line1: Optional[int] = None) -> None:
         if line1 is None:
             line1 = line0
         elif line0 > line1:
             line0, line1 = line1, line0
-        darea = self.dareas[f]
-        w, h = darea.get_allocation().width, self.font_height
-        darea.queue_draw_area(0, line0 * h - int(self.vadj.get_value()), w, (line1 - line0 + 1) * h)
+        self._redraw_lines.setdefault(f, []).append((line0, line1))
+        self._queueRedraw(None)
 
     # scroll vertically to ensure the current line is visible
     def _ensure_line_is_visible(self, i: int) -> None:
@@ -1874,7 +2085,7 @@ class FileDiffViewerBase(Gtk.Grid):
     def _create_menu(specs):
         menu = Gtk.Menu()
         for spec in specs:
-            if len(spec) > 0:
+            if spec:
                 (label, cb, cb_data, image_icon_name, sensitive) = spec
                 item = Gtk.ImageMenuItem.new_with_mnemonic(label)
                 item.set_use_underline(True)
@@ -1955,8 +2166,21 @@ class FileDiffViewerBase(Gtk.Grid):
         else:
             lookup = None
 
+        # identical strings have no differences
+        if s1 == s2:
+            return result
+
+        if len(s1) * len(s2) > _MAX_CHARACTER_DIFF_COST:
+            # comparing very long lines one character at a time is too slow so
+            # treat the whole line as different
+            matching_blocks = [(len(s1), len(s2), 0)]
+        else:
+            # autojunk would ignore frequent characters such as spaces when
+            # matching long lines
+            matching_blocks = SequenceMatcher(None, s1, s2, autojunk=False).get_matching_blocks()
+
         start = 0
-        for block in difflib.SequenceMatcher(None, s1, s2).get_matching_blocks():
+        for block in matching_blocks:
             end = block[idx]
             # skip zero length blocks
             if start < end:
@@ -1996,25 +2220,16 @@ class FileDiffViewerBase(Gtk.Grid):
                 return None
             if self.prefs.getBool('display_ignore_whitespace'):
                 # strip all white space characters
-                for c in utils.whitespace:
-                    s = s.replace(c, '')
+                s = s.translate(_WHITESPACE_DELETE_TABLE)
             elif self.prefs.getBool('display_ignore_whitespace_changes'):
                 # map all spans of white space characters to a single space
-                first = True
-                temp = []
-                for c in s:
-                    if c in utils.whitespace:
-                        if first:
-                            temp.append(' ')
-                            first = False
-                    else:
-                        temp.append(c)
-                        first = True
-                s = ''.join(temp)
+                s = _WHITESPACE_PATTERN.sub(' ', s)
             if self.prefs.getBool('display_ignore_case'):
                 # force everything to be upper case
                 s = s.upper()
-            # cache the hash
+            # cache the hash, interning makes equal lines in different panes
+            # the same object so comparing them is an identity check
+            s = sys.intern(s)
             line.compare_string = s
         return s
 
@@ -2699,7 +2914,7 @@ class FileDiffViewerBase(Gtk.Grid):
             # check if the keyval matches a line mode action
             action = theResources.getActionForKey('line_mode', event.keyval, mask)
             if action in self._line_mode_actions:
-                self._line_mode_actions[action]()
+                getattr(self, self._line_mode_actions[action])()
                 retval = True
         elif self.mode == EditMode.CHAR:
             f = self.current_pane
@@ -2712,7 +2927,7 @@ class FileDiffViewerBase(Gtk.Grid):
             # check if the keyval matches a character mode action
             action = theResources.getActionForKey('character_mode', event.keyval, mask)
             if action in self._character_mode_actions:
-                self._character_mode_actions[action]()
+                getattr(self, self._character_mode_actions[action])()
             # allow CTRL-Tab for widget navigation
             elif event.keyval == Gdk.KEY_Tab and event.state & Gdk.ModifierType.CONTROL_MASK:
                 retval = False
@@ -2823,7 +3038,7 @@ class FileDiffViewerBase(Gtk.Grid):
                             if self.prefs.getBool('editor_expand_tabs'):
                                 s = ' ' * w
                             else:
-                                width = self.prefs.getInt('display_tab_width')
+                                width = self._tab_width
                                 s = '\t' * (w // width) + ' ' * (w % width)
                             j = 0
                     else:
@@ -2876,7 +3091,7 @@ class FileDiffViewerBase(Gtk.Grid):
                             # convert to spaces
                             s += ' ' * w
                         else:
-                            tab_width = self.prefs.getInt('display_tab_width')
+                            tab_width = self._tab_width
                             # replace with tab characters where possible
                             s += '\t' * (w // tab_width)
                             s += ' ' * (w % tab_width)
@@ -2907,7 +3122,7 @@ class FileDiffViewerBase(Gtk.Grid):
                                 if self.prefs.getBool('editor_expand_tabs'):
                                     s = ' ' * ws
                                 else:
-                                    tab_width = self.prefs.getInt('display_tab_width')
+                                    tab_width = self._tab_width
                                     s = '\t' * (ws // tab_width) + ' ' * (ws % tab_width)
                                 if i == start_i:
                                     start_j = len(s) + max(0, start_j - j)
@@ -2929,7 +3144,7 @@ class FileDiffViewerBase(Gtk.Grid):
                             temp -= 1
                     else:
                         w = 0
-                    tab_width = self.prefs.getInt('display_tab_width')
+                    tab_width = self._tab_width
                     if temp > 0:
                         # insert a regular tab
                         ws = tab_width - w % tab_width
@@ -2957,7 +3172,7 @@ class FileDiffViewerBase(Gtk.Grid):
             # check if the keyval matches an align mode action
             action = theResources.getActionForKey('align_mode', event.keyval, mask)
             if action in self._align_mode_actions:
-                self._align_mode_actions[action]()
+                getattr(self, self._align_mode_actions[action])()
                 retval = True
         self.closeUndoBlock()
         return retval
@@ -3092,8 +3307,8 @@ class FileDiffViewerBase(Gtk.Grid):
     # recompute viewport size and redraw as the display preferences may have
     # changed
     def prefsUpdated(self) -> None:
-        # clear cache as tab width may have changed
-        self.string_width_cache = {}
+        self._readDisplayPrefs()
+        self._readAlignmentPrefs()
         self.setFont(
             Pango.FontDescription.from_string(self.prefs.getString('display_font')))
         # update preedit text
@@ -3424,10 +3639,10 @@ class FileDiffViewerBase(Gtk.Grid):
         for i in range(start, end + 1):
             text = self.getLineText(f, i)
             if text is not None:
-                # locate trailing whitespace
-                old_n = n = utils.len_minus_line_ending(text)
-                while n > 0 and text[n - 1] in utils.whitespace:
-                    n -= 1
+                # locate trailing whitespace, the line ending characters are
+                # also white space so they are stripped too
+                old_n = utils.len_minus_line_ending(text)
+                n = len(text.rstrip(utils.whitespace))
                 # update line if it changed
                 if n < old_n:
                     self.updateText(f, i, text[:n] + text[old_n:])
@@ -3495,7 +3710,7 @@ class FileDiffViewerBase(Gtk.Grid):
             self.setLineMode()
         self.recordEditMode()
         f = self.current_pane
-        tab_width = self.prefs.getInt('display_tab_width')
+        tab_width = self._tab_width
         # find cursor range
         start, end = self.selection_line, self.current_line
         if end < start:
@@ -3544,7 +3759,7 @@ class FileDiffViewerBase(Gtk.Grid):
                     if self.prefs.getBool('editor_expand_tabs'):
                         s = ' ' * ws
                     else:
-                        tab_width = self.prefs.getInt('display_tab_width')
+                        tab_width = self._tab_width
                         s = '\t' * (ws // tab_width) + ' ' * (ws % tab_width)
                     self.updateText(f, i, s + text[j:])
         if self.mode == EditMode.CHAR:
@@ -3735,8 +3950,8 @@ class CharacterClass(IntFlag):
     OTHER = 2
 
 
-# maps similar types of characters to a group
-def _get_character_class(c: str) -> CharacterClass:
+# classifies a character without the ASCII lookup table
+def _classify_character(c: str) -> CharacterClass:
     if c.isalnum() or c == '_':
         return CharacterClass.ALPHANUMERIC
     if c.isspace():
@@ -3744,13 +3959,38 @@ def _get_character_class(c: str) -> CharacterClass:
     return CharacterClass.OTHER
 
 
+# precomputed classes of the ASCII characters
+_ASCII_CHARACTER_CLASSES: Final[Tuple[CharacterClass, ...]] = tuple(
+    _classify_character(chr(i)) for i in range(128))
+
+
+# maps similar types of characters to a group
+def _get_character_class(c: str) -> CharacterClass:
+    v = ord(c)
+    if v < 128:
+        return _ASCII_CHARACTER_CLASSES[v]
+    return _classify_character(c)
+
+
 # patience diff with difflib-style fallback
 def _patience_diff(a, b):
-    matches, len_a, len_b = [], len(a), len(b)
-    if len_a and len_b:
-        blocks = [(0, len_a, 0, len_b, 0)]
+    len_a, len_b = len(a), len(b)
+    # identical inputs are a single match
+    if len_a == len_b and a == b:
+        return [(0, 0, len_a), (len_a, len_b, 0)] if len_a else [(0, 0, 0)]
+    # only search the region between the common prefix and suffix
+    start, n = 0, min(len_a, len_b)
+    while start < n and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len_a, len_b
+    while start < end_a and start < end_b and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    matches = []
+    if start < end_a and start < end_b:
+        blocks = [(start, end_a, start, end_b)]
         while blocks:
-            start_a, end_a, start_b, end_b, match_idx = blocks.pop()
+            start_a, end_a, start_b, end_b = blocks.pop()
             aa, bb = a[start_a:end_a], b[start_b:end_b]
             # try patience
             pivots = _patience_subsequence(aa, bb)
@@ -3767,18 +4007,17 @@ def _patience_diff(a, b):
                             idx_b -= 1
                         # if anything is before recurse on the section
                         if start_a < idx_a and start_b < idx_b:
-                            blocks.append((start_a, idx_a, start_b, idx_b, match_idx))
+                            blocks.append((start_a, idx_a, start_b, idx_b))
                         # extend after
                         start_a, start_b = pivot_a + 1, pivot_b + 1
                         while start_a < end_a and start_b < end_b and a[start_a] == b[start_b]:
                             start_a += 1
                             start_b += 1
                         # record match
-                        matches.insert(match_idx, (idx_a, idx_b, start_a - idx_a))
-                        match_idx += 1
+                        matches.append((idx_a, idx_b, start_a - idx_a))
                 # if anything is after recurse on the section
                 if start_a < end_a and start_b < end_b:
-                    blocks.append((start_a, end_a, start_b, end_b, match_idx))
+                    blocks.append((start_a, end_a, start_b, end_b))
             else:
                 # fallback if patience fails
                 pivots = _lcs_approx(aa, bb)
@@ -3788,15 +4027,18 @@ def _patience_diff(a, b):
                     idx_b += start_b
                     # if anything is before recurse on the section
                     if start_a < idx_a and start_b < idx_b:
-                        blocks.append((start_a, idx_a, start_b, idx_b, match_idx))
+                        blocks.append((start_a, idx_a, start_b, idx_b))
                     # record match
-                    matches.insert(match_idx, (idx_a, idx_b, n))
-                    match_idx += 1
+                    matches.append((idx_a, idx_b, n))
                     idx_a += n
                     idx_b += n
                     # if anything is after recurse on the section
                     if idx_a < end_a and idx_b < end_b:
-                        blocks.append((idx_a, end_a, idx_b, end_b, match_idx))
+                        blocks.append((idx_a, end_a, idx_b, end_b))
+        # the sections are disjoint and ordered in both sequences so sorting
+        # restores the order of the matches, this is cheaper than inserting
+        # each match at its final position
+        matches.sort()
     # try matching from beginning to first match block
     if matches:
         end_a, end_b = matches[0][:2]
@@ -3829,18 +4071,17 @@ def _patience_diff(a, b):
 def _patience_subsequence(a, b):
     # value unique lines by their order in each list
     value_a, value_b = {}, {}
-    # find unique values in 'a'
+    # find unique values in 'a', setdefault() only returns something other
+    # than the index for repeated values
+    setdefault = value_a.setdefault
     for i, s in enumerate(a):
-        if s in value_a:
+        if setdefault(s, i) != i:
             value_a[s] = -1
-        else:
-            value_a[s] = i
     # find unique values in 'b'
+    setdefault = value_b.setdefault
     for i, s in enumerate(b):
-        if s in value_b:
+        if setdefault(s, i) != i:
             value_b[s] = -1
-        else:
-            value_b[s] = i
     # lay down items in 'b' as if playing patience if the item is unique in
     # 'a' and 'b'
     pile, pointers, atob = [], {}, {}
@@ -3852,18 +4093,13 @@ def _patience_subsequence(a, b):
             if vb != -1:
                 atob[v] = vb
                 # find appropriate pile for v
-                start, end = 0, len(pile)
+                end = len(pile)
                 # optimisation as values usually increase
                 if end and v > pile[-1]:
                     start = end
                 else:
-                    while start < end:
-                        mid = (start + end) // 2
-                        if v < pile[mid]:
-                            end = mid
-                        else:
-                            start = mid + 1
-                if start < len(pile):
+                    start = bisect_right(pile, v)
+                if start < end:
                     pile[start] = v
                 else:
                     append(v)
@@ -3955,19 +4191,104 @@ def _lcs_approx(a, b):
     return None
 
 
-# True if the string ends with '\r\n'
-def _has_dos_line_ending(s: str) -> bool:
-    return s.endswith('\r\n')
+# difflib.SequenceMatcher with a find_longest_match() that narrows the
+# positions of each element of 'a' in 'b' to [blo, bhi) once per call instead
+# of once for every occurrence of the element in a[alo:ahi]
+class _SequenceMatcher(difflib.SequenceMatcher):
+    def find_longest_match(self, alo=0, ahi=None, blo=0, bhi=None):
+        a, b, b2j, isbjunk = self.a, self.b, self.b2j, self.bjunk.__contains__
+        if ahi is None:
+            ahi = len(a)
+        if bhi is None:
+            bhi = len(b)
+        besti, bestj, bestsize = alo, blo, 0
+        # j2len[j] is the length of the longest match ending with a[i - 1] and b[j]
+        j2len: Dict[int, int] = {}
+        filtered: Dict[Any, List[int]] = {}
+        nothing: List[int] = []
+        for i in range(alo, ahi):
+            x = a[i]
+            js = filtered.get(x)
+            if js is None:
+                # the positions in b2j are sorted
+                js = b2j.get(x, nothing)
+                if js:
+                    js = js[bisect_left(js, blo):bisect_left(js, bhi)]
+                filtered[x] = js
+            j2lenget = j2len.get
+            newj2len = {}
+            for j in js:
+                k = newj2len[j] = j2lenget(j - 1, 0) + 1
+                if k > bestsize:
+                    besti, bestj, bestsize = i - k + 1, j - k + 1, k
+            j2len = newj2len
+
+        # extend the match with non-junk and then junk elements exactly as
+        # difflib does
+        while (
+            besti > alo and bestj > blo and
+            not isbjunk(b[bestj - 1]) and a[besti - 1] == b[bestj - 1]
+        ):
+            besti, bestj, bestsize = besti - 1, bestj - 1, bestsize + 1
+        while (
+            besti + bestsize < ahi and bestj + bestsize < bhi and
+            not isbjunk(b[bestj + bestsize]) and a[besti + bestsize] == b[bestj + bestsize]
+        ):
+            bestsize += 1
+        while (
+            besti > alo and bestj > blo and
+            isbjunk(b[bestj - 1]) and a[besti - 1] == b[bestj - 1]
+        ):
+            besti, bestj, bestsize = besti - 1, bestj - 1, bestsize + 1
+        while (
+            besti + bestsize < ahi and bestj + bestsize < bhi and
+            isbjunk(b[bestj + bestsize]) and a[besti + bestsize] == b[bestj + bestsize]
+        ):
+            bestsize += 1
+        return difflib.Match(besti, bestj, bestsize)
+
+
+# spans of white space characters
+_WHITESPACE_PATTERN: Final = re.compile(f'[{re.escape(utils.whitespace)}]+')
 
+# preferences affecting the hashes used to align lines
+_ALIGNMENT_PREFS: Final = (
+    'align_ignore_whitespace',
+    'align_ignore_endofline',
+    'align_ignore_blanklines',
+    'align_ignore_whitespace_changes',
+    'align_ignore_case')
 
-# True if the string ends with '\r'
-def _has_mac_line_ending(s: str) -> bool:
-    return s.endswith('\r')
+# translation table deleting all white space characters
+_WHITESPACE_DELETE_TABLE: Final = str.maketrans('', '', utils.whitespace)
 
+# translation table showing spaces as centre-dots and newlines as pilcrows
+_VISIBLE_WHITESPACE_TABLE: Final = str.maketrans({' ': '\u00b7', '\n': '\u00b6'})
 
-# True if the string ends with '\n' but not '\r\n'
-def _has_unix_line_ending(s: str) -> bool:
-    return s.endswith('\n') and not s.endswith('\r\n')
+# upper bound on the product of the lengths of two lines compared one character
+# at a time
+_MAX_CHARACTER_DIFF_COST: Final = 1000000
+
+# column widths of the ASCII characters other than tab, control characters are
+# shown with a '^' prefix
+_ASCII_CHARACTER_WIDTHS: Final[Dict[str, int]] = {
+    chr(v): 1 if v >= 32 or v == 10 else 2 for v in range(128) if v != 9
+}
+
+# column widths of strings keyed by tab width, whether white space is visible,
+# and the string
+_string_width_cache: Dict[Tuple[int, bool, str], int] = {}
+
+# number of strings whose widths are remembered
+_STRING_WIDTH_CACHE_SIZE: Final = 8192
+
+# prefer the C implementation of SequenceMatcher from cdifflib
+SequenceMatcher = _SequenceMatcher if CSequenceMatcher is None else CSequenceMatcher
+
+
+# all line ending styles
+_ALL_FORMATS: Final[LineEnding] = (
+    LineEnding.DOS_FORMAT | LineEnding.MAC_FORMAT | LineEnding.UNIX_FORMAT)
 
 
 # returns the format mask for a list of strings
@@ -3975,34 +4296,61 @@ def _get_format(lines: List[Optional[str]]) -> LineEnding:
     flags: LineEnding = LineEnding.NO_FORMAT
     for line in lines:
         if line is not None:
-            if _has_dos_line_ending(line):
+            if line.endswith('\r\n'):
                 flags |= LineEnding.DOS_FORMAT
-            elif _has_mac_line_ending(line):
+            elif line.endswith('\r'):
                 flags |= LineEnding.MAC_FORMAT
-            elif _has_unix_line_ending(line):
+            elif line.endswith('\n'):
                 flags |= LineEnding.UNIX_FORMAT
+            else:
+                continue
+            if flags == _ALL_FORMATS:
+                # no other lines can change the result
+                break
     return flags
 
 
+# returns the format mask for a single string
+def _get_line_format(s: str) -> LineEnding:
+    if s.endswith('\r\n'):
+        return LineEnding.DOS_FORMAT
+    if s.endswith('\r'):
+        return LineEnding.MAC_FORMAT
+    if s.endswith('\n'):
+        return LineEnding.UNIX_FORMAT
+    return LineEnding.NO_FORMAT
+
+
+# line ending style of the host
+_HOST_FORMAT: Final[LineEnding] = {
+    '\r\n': LineEnding.DOS_FORMAT,
+    '\r': LineEnding.MAC_FORMAT,
+    '\n': LineEnding.UNIX_FORMAT
+}.get(os.linesep, LineEnding.NO_FORMAT)
+
+# line ending characters for each format
+_EOL_SUFFIX: Final[Dict[LineEnding, str]] = {
+    LineEnding.DOS_FORMAT: '\r\n',
+    LineEnding.MAC_FORMAT: '\r',
+    LineEnding.UNIX_FORMAT: '\n'
+}
+
+
 # convenience method to change the line ending of a string
 def _convert_to_format(s: Optional[str], fmt: LineEnding) -> Optional[str]:
     if s is not None and fmt != 0:
-        old_format = _get_format([s])
+        old_format = _get_line_format(s)
         if old_format != 0 and (old_format & fmt) == 0:
-            s = utils.strip_eol(s)
             # prefer the host line ending style
-            if (fmt & LineEnding.DOS_FORMAT) and os.linesep == '\r\n':
-                s += os.linesep
-            elif (fmt & LineEnding.MAC_FORMAT) and os.linesep == '\r':
-                s += os.linesep
-            elif (fmt & LineEnding.UNIX_FORMAT) and os.linesep == '\n':
-                s += os.linesep
+            if fmt & _HOST_FORMAT:
+                new_format = _HOST_FORMAT
             elif fmt & LineEnding.UNIX_FORMAT:
-                s += '\n'
+                new_format = LineEnding.UNIX_FORMAT
             elif fmt & LineEnding.DOS_FORMAT:
-                s += '\r\n'
-            elif fmt & LineEnding.MAC_FORMAT:
-                s += '\r'
+                new_format = LineEnding.DOS_FORMAT
+            else:
+                new_format = LineEnding.MAC_FORMAT
+            s = s[:-len(_EOL_SUFFIX[old_format])] + _EOL_SUFFIX[new_format]
     return s
 
 
@@ -4023,34 +4371,39 @@ def _create_block(n: int) -> List[int]:
 
 # returns the two sets of blocks after cutting at 'i'
 def _cut_blocks(i: int, blocks: List[int]) -> Tuple[List[int], List[int]]:
-    pre, post, nlines = [], [], 0
-    for b in blocks:
+    # only walk the blocks up to the cut, the rest are copied with a slice
+    nlines = 0
+    for k, b in enumerate(blocks):
         if nlines >= i:
-            post.append(b)
-        elif nlines + b <= i:
-            pre.append(b)
-        else:
+            return blocks[:k], blocks[k:]
+        if nlines + b > i:
             n = i - nlines
+            pre = blocks[:k]
             pre.append(n)
-            post.append(b - n)
+            post = [b - n]
+            post.extend(blocks[k + 1:])
+            return pre, post
         nlines += b
-    return pre, post
+    return blocks[:], []
 
 
 # returns a set of blocks containing all of the cuts in the inputs
 def _merge_blocks(leftblocks: List[int], rightblocks: List[int]) -> List[int]:
-    leftblocks, rightblocks, b = leftblocks[:], rightblocks[:], []
-    while len(leftblocks) > 0:
-        nleft, nright = leftblocks[0], rightblocks[0]
+    # walk both lists with an index rather than deleting their first items
+    b: List[int] = []
+    li, ri, nleft, nright = 0, 0, 0, 0
+    while True:
+        if nleft == 0:
+            if li == len(leftblocks):
+                break
+            nleft = leftblocks[li]
+            li += 1
+        if nright == 0:
+            nright = rightblocks[ri]
+            ri += 1
         n = min(nleft, nright)
-        if n < nleft:
-            leftblocks[0] -= n
-        else:
-            del leftblocks[0]
-        if n < nright:
-            rightblocks[0] -= n
-        else:
-            del rightblocks[0]
+        nleft -= n
+        nright -= n
         b.append(n)
     return b
 
@@ -4064,58 +4417,110 @@ def _merge_blocks(leftblocks: List[int], rightblocks: List[int]) -> List[int]:
 #
 # this method will return the union of two sorted lists of ranges
 def _merge_ranges(r1, r2):
-    r1, r2, result, start = r1[:], r2[:], [], 0
-    rs = [r1, r2]
-    while len(r1) > 0 and len(r2) > 0:
-        flags, start = 0, min(r1[0][0], r2[0][0])
-        if start == r1[0][0]:
-            r1end = r1[0][1]
-            flags |= r1[0][2]
+    # walk both lists with an index rather than deleting their first items,
+    # 'range1' and 'range2' are the unconsumed parts of the current ranges
+    result, i1, i2, n1, n2 = [], 0, 0, len(r1), len(r2)
+    range1 = r1[0] if n1 > 0 else None
+    range2 = r2[0] if n2 > 0 else None
+    while i1 < n1 and i2 < n2:
+        start1, end1, flags1 = range1
+        start2, end2, flags2 = range2
+        flags, start = 0, min(start1, start2)
+        if start == start1:
+            r1end = end1
+            flags |= flags1
         else:
-            r1end = r1[0][0]
-        if start == r2[0][0]:
-            r2end = r2[0][1]
-            flags |= r2[0][2]
+            r1end = start1
+        if start == start2:
+            r2end = end2
+            flags |= flags2
         else:
-            r2end = r2[0][0]
+            r2end = start2
         end = min(r1end, r2end)
         result.append((start, end, flags))
-        for r in rs:
-            if start == r[0][0]:
-                if end == r[0][1]:
-                    del r[0]
-                else:
-                    r[0] = (end, r[0][1], r[0][2])
-    result.extend(r1)
-    result.extend(r2)
+        if start == start1:
+            if end == end1:
+                i1 += 1
+                if i1 < n1:
+                    range1 = r1[i1]
+            else:
+                range1 = (end, end1, flags1)
+        if start == start2:
+            if end == end2:
+                i2 += 1
+                if i2 < n2:
+                    range2 = r2[i2]
+            else:
+                range2 = (end, end2, flags2)
+    if i1 < n1:
+        result.append(range1)
+        result.extend(r1[i1 + 1:])
+    if i2 < n2:
+        result.append(range2)
+        result.extend(r2[i2 + 1:])
     return result
 
 
+# forgets the oldest half of the remembered string widths, dictionaries keep
+# their insertion order so these are the first keys
+def _trim_string_width_cache() -> None:
+    n = len(_string_width_cache) // 2
+    for key in list(itertools.islice(_string_width_cache, n)):
+        del _string_width_cache[key]
+
+
 # eliminates lines that are spacing lines in all panes
 def _remove_null_lines(blocks, lines_set):
-    bi, bn, i = 0, 0, 0
-    while bi < len(blocks):
-        while i < bn + blocks[bi]:
-            for lines in lines_set:
-                if lines[i] is not None:
-                    i += 1
-                    break
-            else:
-                for lines in lines_set:
-                    del lines[i]
-                blocks[bi] -= 1
-        if blocks[bi] == 0:
-            del blocks[bi]
-        else:
-            bn += blocks[bi]
-            bi += 1
+    mask = _null_lines_mask(blocks, lines_set)
+    if mask is not None:
+        keep, total = mask
+        for lines in lines_set:
+            lines[:total] = [line for line, k in zip(lines, keep) if k]
+
+
+# returns copies of the lists of lines with the rows that are null in all of
+# them removed, this is _remove_null_lines() without copying the lists first
+def _copy_without_null_lines(blocks, lines_set):
+    mask = _null_lines_mask(blocks, lines_set)
+    if mask is None:
+        return [lines[:] for lines in lines_set]
+    keep, total = mask
+    return [[line for line, k in zip(lines, keep) if k] + lines[total:] for lines in lines_set]
+
+
+# mark the lines to keep in a single pass and compact the block sizes at once,
+# returns the marks and the number of rows they cover or None if there is
+# nothing to remove
+def _null_lines_mask(blocks, lines_set):
+    total = sum(blocks)
+    n = len(lines_set)
+    keep = [row.count(None) < n for row in zip(*lines_set)][:total]
+    if len(keep) == total and all(keep) and 0 not in blocks:
+        return None
+    new_blocks, i = [], 0
+    for size in blocks:
+        kept = sum(keep[i:i + size])
+        i += size
+        if kept > 0:
+            new_blocks.append(kept)
+    blocks[:] = new_blocks
+    return keep, total
+
+
+# returns true if two lines, either of which may be a spacer, show the same text
+def _same_text(
+        a: Optional['FileDiffViewerBase.Line'],
+        b: Optional['FileDiffViewerBase.Line']) -> bool:
+    if a is b:
+        return True
+    if a is None or b is None:
+        return False
+    return a.getText() == b.getText()
 
 
 # returns true if the string only contains whitespace characters
 def _is_blank(s: str) -> bool:
-    for c in utils.whitespace:
-        s = s.replace(c, '')
-    return len(s) == 0
+    return len(s.strip(utils.whitespace)) == 0
 
 
 # use Pango.SCALE instead of Pango.PIXELS to avoid overflow exception
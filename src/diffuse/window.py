@@ -19,12 +19,13 @@
 
 import os
 import codecs
+import re
 import shlex
 import stat
 import webbrowser
 
 from gettext import gettext as _
-from typing import List, Optional
+from typing import Final, List, Optional
 from urllib.parse import urlparse
 
 from diffuse import constants, utils
@@ -47,6 +48,9 @@ from gi.repository import Gdk, Gio, GLib, GObject, Gtk, Pango  # type: ignore #
 
 theVCSs = VcsRegistry()
 
+# characters of a path that must be escaped in a URL
+_URL_UNSAFE_PATTERN: Final = re.compile(r'[\x00-\x20$&+,/:;=?@"<>#%\\^\[\]`\x7b-\U0010ffff]')
+
 
 class NotebookTab(Gtk.EventBox):
     """Notebook tab widget.
@@ -381,8 +385,9 @@ class FileDiffViewer(FileDiffViewerBase):
 
     # load a new file into pane 'f'
     # 'info' indicates the name of the file and how to retrieve it from the
-    # version control system if applicable
-    def load(self, f: int, info: FileInfo) -> None:
+    # version control system if applicable, 'contents' can supply a revision
+    # that was already retrieved
+    def load(self, f: int, info: FileInfo, contents: Optional[bytes] = None) -> None:
         name = info.name
         encoding = info.encoding
         stat = None
@@ -398,7 +403,7 @@ class FileDiffViewer(FileDiffViewerBase):
                         contents = fd.read()
                     # get the file's modification times so we can detect changes
                     stat = os.stat(name)
-                else:
+                elif contents is None:
                     if info.vcs is None:
                         raise IOError('Not under version control.')
                     fullname = os.path.abspath(name)
@@ -433,6 +438,8 @@ class FileDiffViewer(FileDiffViewerBase):
 
     # load a new file into pane 'f'
     def open_file(self, f: int, reload: bool = False) -> None:
+        # look for work areas again in case they changed since the last time
+        theVCSs.clear()
         h = self.headers[f]
         info = h.info
         if not reload:
@@ -890,6 +897,7 @@ class DiffuseWindow(Gtk.ApplicationWindow):
         self.connect('focus-in-event', self.focus_in_cb)
 
     def _create_menu(self, sections):
+        app = self.get_application()
         menu = Gio.Menu.new()
         for section in sections:
             section_menu = Gio.Menu.new()
@@ -918,10 +926,10 @@ class DiffuseWindow(Gtk.ApplicationWindow):
 
                     # Bind accelerator (in any)
                     key_binding = theResources.getKeyBindings('menu', action_name)
-                    if len(key_binding) > 0:
+                    if key_binding:
                         detailed_action_name = Gio.Action.print_detailed_name(win_action_name, cb_data)  # noqa: 501
                         accels = [Gtk.accelerator_name(*key_binding[0])]
-                        self.get_application().set_accels_for_action(detailed_action_name, accels)
+                        app.set_accels_for_action(detailed_action_name, accels)
 
                     # Append item to menu
                     section_menu.append_item(item)
@@ -1333,18 +1341,31 @@ class DiffuseWindow(Gtk.ApplicationWindow):
             vcs = theVCSs.findByFolder(dn, self.prefs)
             if vcs is not None:
                 try:
-                    for specs in vcs.getCommitTemplate(self.prefs, options['commit'], names):
-                        viewer = self.newFileDiffViewer(len(specs))
-                        for i, spec in enumerate(specs):
-                            name, rev = spec
-                            viewer.load(i, FileInfo(name, encoding, vcs, rev))
-                        viewer.setOptions(options)
+                    template = vcs.getCommitTemplate(self.prefs, options['commit'], names)
+                    self._createTemplateTabs(vcs, template, encoding, options)
                 except (IOError, OSError):
                     utils.logErrorAndDialog(
                         _('Error retrieving commits for %s.') % (dn, ),
                         self.get_toplevel()
                     )
 
+    def _createTemplateTabs(self, vcs, template, encoding, options):
+        """Create a new viewer for each list of file revisions in 'template'."""
+        # retrieve all of the revisions up front so the VCS can batch them
+        revisions = vcs.getRevisions(
+            self.prefs,
+            [(os.path.abspath(name), rev) for specs in template for name, rev in specs
+             if name is not None and rev is not None])
+        for specs in template:
+            viewer = self.newFileDiffViewer(len(specs))
+            for i, spec in enumerate(specs):
+                name, rev = spec
+                contents = None
+                if name is not None and rev is not None:
+                    contents = revisions.get((os.path.abspath(name), rev))
+                viewer.load(i, FileInfo(name, encoding, vcs, rev), contents)
+            viewer.setOptions(options)
+
     def createModifiedFileTabs(self, items, labels, options):
         """Create a new viewer for each modified file found in 'items'."""
         new_items = []
@@ -1365,12 +1386,8 @@ class DiffuseWindow(Gtk.ApplicationWindow):
             vcs = theVCSs.findByFolder(dn, self.prefs)
             if vcs is not None:
                 try:
-                    for specs in vcs.getFolderTemplate(self.prefs, names):
-                        viewer = self.newFileDiffViewer(len(specs))
-                        for i, spec in enumerate(specs):
-                            name, rev = spec
-                            viewer.load(i, FileInfo(name, encoding, vcs, rev))
-                        viewer.setOptions(options)
+                    template = vcs.getFolderTemplate(self.prefs, names)
+                    self._createTemplateTabs(vcs, template, encoding, options)
                 except (IOError, OSError):
                     utils.logErrorAndDialog(
                         _('Error retrieving modifications for %s.') % (dn, ),
@@ -1421,6 +1438,8 @@ class DiffuseWindow(Gtk.ApplicationWindow):
             rev = None
         dialog.destroy()
         if accept:
+            # look for work areas again in case they changed since the last time
+            theVCSs.clear()
             viewer = self.newLoadedFileDiffViewer([(name, [(rev, encoding)], None)])
             self.notebook.set_current_page(self.notebook.get_n_pages() - 1)
             viewer.grab_focus()
@@ -1440,6 +1459,8 @@ class DiffuseWindow(Gtk.ApplicationWindow):
         name, encoding = dialog.get_filename(), dialog.get_encoding()
         dialog.destroy()
         if accept:
+            # look for work areas again in case they changed since the last time
+            theVCSs.clear()
             n = self.notebook.get_n_pages()
             self.createModifiedFileTabs([(name, [(None, encoding)])], [], {})
             if self.notebook.get_n_pages() > n:
@@ -1466,6 +1487,8 @@ class DiffuseWindow(Gtk.ApplicationWindow):
         encoding = dialog.get_encoding()
         dialog.destroy()
         if accept:
+            # look for work areas again in case they changed since the last time
+            theVCSs.clear()
             n = self.notebook.get_n_pages()
             self.createCommitFileTabs([(name, [(None, encoding)])], [], {'commit': rev})
             if self.notebook.get_n_pages() > n:
@@ -1611,6 +1634,8 @@ class DiffuseWindow(Gtk.ApplicationWindow):
 
     # notify all viewers of changes to the preferences
     def preferences_updated(self) -> None:
+        # the VCS search order or the VCS settings may have changed
+        theVCSs.clear()
         n = self.notebook.get_n_pages()
         self.notebook.set_show_tabs(self.prefs.getBool('tabs_always_show') or n > 1)
         for i in range(n):
@@ -1712,22 +1737,16 @@ class DiffuseWindow(Gtk.ApplicationWindow):
     @staticmethod
     def _path_to_url(path: str, proto: str = 'file') -> str:
         """Constructs a full URL for the named file."""
-        r = [proto, ':///']
-        s = os.path.abspath(path)
-        i = 0
-        while i < len(s) and s[i] == os.sep:
-            i += 1
-        for c in s[i:]:
-            if c == os.sep:
-                c = '/'
-            elif c == ':' and utils.isWindows():
-                c = '|'
-            else:
-                v = ord(c)
-                if v <= 0x20 or v >= 0x7b or c in '$&+,/:;=?@"<>#%\\^[]`':
-                    c = '%%%02X' % (v, )
-            r.append(c)
-        return ''.join(r)
+        s = os.path.abspath(path).lstrip(os.sep)
+        parts = [
+            _URL_UNSAFE_PATTERN.sub(lambda m: '%%%02X' % (ord(m.group()), ), p)
+            for p in s.split(os.sep)
+        ]
+        s = '/'.join(parts)
+        if utils.isWindows():
+            # '%' is escaped too so '%3A' can only come from ':'
+            s = s.replace('%3A', '|')
+        return f'{proto}:///{s}'
 
     # callback for the about menu item
     def about_cb(self, widget, data):
@@ -1771,7 +1790,7 @@ with this program; if not, write to the Free Software Foundation, Inc.,
 def _append_buttons(box, size, specs):
     """Convenience method for packing buttons into a container."""
     for spec in specs:
-        if len(spec) > 0:
+        if spec:
             (icon_name, cb, cb_data, label) = spec
             button = Gtk.Button()
             button.set_relief(Gtk.ReliefStyle.NONE)